@@ -1,79 +1,13 @@
-import pandas as pd
-import random
-import pyodbc
+# expand_data.py – Feedback tablosuna, koşul başına henüz görülmemiş bitkilerle
+# rastgele etiketli 1000 sentetik kayıt ekler.
+# Artık generate_feedback.py'nin ince bir sarmalayıcısı; ek argümanlar
+# (ör. --rows 100000 --seed 7) olduğu gibi iletilir.
+import sys
 
-# MSSQL bağlantı bilgileri
-conn_str = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=localhost\\SQLEXPRESS;"
-    "DATABASE=Smart_Plant_Recomandation_System;"
-    "Trusted_Connection=yes;"
-)
+from generate_feedback import main
+from storage import use_local_sqlserver  # generate_feedback ortak DB katmanını yola ekler
 
-# Veritabanından mevcut veriyi çek
-query = "SELECT * FROM Feedback"
-conn = pyodbc.connect(conn_str)
-df = pd.read_sql(query, conn)
+use_local_sqlserver()  # varsayılan: localhost\SQLEXPRESS
 
-df.columns = [
-    "area_size", "sunlight_need", "environment_type", "climate_type",
-    "fertilizer_frequency", "pesticide_frequency", "has_pet", "has_child",
-    "suggested_plant", "user_feedback", "id", "watering_frequency"
-]
-
-# === Veri Genişletme ===
-condition_cols = [
-    "area_size", "sunlight_need", "environment_type", "climate_type",
-    "fertilizer_frequency", "pesticide_frequency", "has_pet", "has_child", "watering_frequency"
-]
-
-all_plants = set(df["suggested_plant"].unique())
-synthetic_data = []
-max_new_records = 1000
-
-unique_conditions = df[condition_cols].drop_duplicates().to_dict(orient="records")
-
-for condition in unique_conditions:
-    existing_plants = set(
-        df.loc[
-            (df[condition_cols] == pd.Series(condition)).all(axis=1),
-            "suggested_plant"
-        ]
-    )
-    candidate_plants = list(all_plants - existing_plants)
-
-    for _ in range(min(3, len(candidate_plants))):
-        if len(synthetic_data) >= max_new_records:
-            break
-        new_plant = random.choice(candidate_plants)
-        candidate_plants.remove(new_plant)
-
-        new_row = condition.copy()
-        new_row["suggested_plant"] = new_plant
-        new_row["user_feedback"] = random.choice([0, 1])
-
-       
-        synthetic_data.append(new_row)
-
-df_synthetic = pd.DataFrame(synthetic_data)
-
-
-# === Yeni kayıtları DATABASE'e yaz ===
-cursor = conn.cursor()
-
-for _, row in df_synthetic.iterrows():
-    cursor.execute("""
-    INSERT INTO Feedback (
-        area_size, sunlight_need, environment_type, climate_type,
-        fertilizer_frequency, pesticide_frequency, has_pet, has_child,
-        suggested_plant, user_feedback, watering_frequency
-    )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-""", tuple(row[col] for col in df.columns if col != "id"))
-
-
-conn.commit()
-cursor.close()
-conn.close()
-
-print(f"✅ {len(df_synthetic)} kayıt SQL Server'daki Feedback tablosuna eklendi.")
+if __name__ == "__main__":
+    main(["--unseen", "--labels", "random", "--rows", "1000", "--db", *sys.argv[1:]])
@@ -0,0 +1,291 @@
+# generate_feedback.py – Vectorised synthetic Feedback generator (CSV / Parquet / DB)
+# --------------------------------------------------------------
+# Replaces the per‑condition loops of expand_data.py / import_database.py:
+#
+# • Seed data (Feedback table or a CSV) is factorised once: every distinct
+#   condition combination gets a condition id, every plant a plant id.
+# • "Plants already seen per condition" is a sorted array of combined keys
+#   cond_id · n_plants + plant_id built by one groupby. --unseen scores a
+#   block of conditions × plants with random numbers, masks the seen keys and
+#   keeps the --per-condition (default 3, as expand_data.py did) lowest per
+#   condition: distinct pairs, no duplicates, conditions in seed order.
+# • The positive / negative labelling patterns are boolean masks evaluated
+#   once per distinct condition and gathered per row.
+# • Rows are produced and written chunk by chunk (CSV append, Parquet row
+#   groups, or storage.bulk_insert), so N can be tens of millions.
+# • Same --seed and --chunk-size → identical output.
+#
+#   python generate_feedback.py --rows 1000000 --out feedback.csv
+#   python generate_feedback.py --rows 1000 --unseen --db              (≈ expand_data.py)
+#   python generate_feedback.py --rows 1000 --labels pattern --db      (≈ import_database.py)
+#   python generate_feedback.py --source-csv Feedback_extended.csv --rows 10000000 --out fb.parquet
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Ortak DB katmanı (../plant_suggestion_system/storage.py): PLANT_DB_BACKEND=odbc|sqlite
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plant_suggestion_system"))
+
+logger = logging.getLogger(__name__)
+
+CONDITION_COLS = [
+    "area_size", "sunlight_need", "environment_type", "climate_type",
+    "fertilizer_frequency", "pesticide_frequency", "has_pet", "has_child", "watering_frequency",
+]
+OUTPUT_COLS = [
+    "area_size", "sunlight_need", "environment_type", "climate_type",
+    "fertilizer_frequency", "pesticide_frequency", "has_pet", "has_child",
+    "suggested_plant", "user_feedback", "watering_frequency",
+]
+CHUNK_SIZE = 100_000
+PER_CONDITION = 3         # --unseen: koşul başına en fazla yeni bitki (None = sınırsız)
+UNSEEN_BLOCK = 1 << 22    # --unseen: bir seferde puanlanan koşul × bitki hücresi
+
+
+# --------------------------------------------------------------
+# 🌱 Seed data
+# --------------------------------------------------------------
+def load_seed(source_csv: Optional[str] = None, sep: str = ";") -> pd.DataFrame:
+    """Existing feedback rows: from *source_csv* or the Feedback table."""
+    if source_csv:
+        df = pd.read_csv(source_csv, sep=sep)
+    else:
+        from storage import get_storage
+        df = get_storage().read_sql(f"SELECT {', '.join(CONDITION_COLS)}, suggested_plant FROM Feedback")
+    missing = set(CONDITION_COLS + ["suggested_plant"]) - set(df.columns)
+    if missing:
+        raise ValueError(f"Seed data lacks columns: {sorted(missing)}")
+    return df
+
+
+class SeedSpace:
+    """Factorised seed: distinct conditions × plants and the seen (condition, plant) keys."""
+
+    def __init__(self, seed_df: pd.DataFrame) -> None:
+        df = seed_df.dropna(subset=CONDITION_COLS + ["suggested_plant"])
+        if df.empty:
+            raise ValueError("Seed data is empty")
+        cond_id = df.groupby(CONDITION_COLS, sort=False).ngroup().to_numpy()
+        plant_id, self.plants = pd.factorize(df["suggested_plant"])
+        self.plants = np.asarray(self.plants, dtype=object)
+        self.n_plants = len(self.plants)
+
+        first = pd.Series(np.arange(len(df))).groupby(cond_id).first().to_numpy()
+        self.conditions: Dict[str, np.ndarray] = {
+            col: df[col].to_numpy(dtype=object)[first] for col in CONDITION_COLS
+        }
+        self.n_conditions = len(first)
+        self.seen = np.unique(cond_id.astype(np.int64) * self.n_plants + plant_id)
+        self.positive, self.negative = label_masks(self.conditions)
+
+    def unseen_pairs(self) -> int:
+        return self.n_conditions * self.n_plants - len(self.seen)
+
+
+# --------------------------------------------------------------
+# 🏷️ Labelling patterns (vectorised)
+# --------------------------------------------------------------
+def label_masks(c: Dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """(always‑positive, always‑negative) masks over condition rows."""
+    env, sun, climate, water, area = (
+        pd.Series(c[k]).astype(str)
+        for k in ("environment_type", "sunlight_need", "climate_type", "watering_frequency", "area_size")
+    )
+    positive = (
+        ((env == "Indoor") & sun.str.lower().str.contains("indirect"))
+        | (climate.isin(["All seasons", "Winter"]) & water.isin(["Weekly", "Bi-weekly"]))
+        | (area.isin(["Mini", "Small"]) & (sun == "6+ hours"))
+    )
+    negative = (
+        ((env == "Indoor") & (sun == "6+ hours"))
+        | ((climate == "Summer") & (water == "Never needed"))
+    )
+    return positive.to_numpy(), negative.to_numpy()
+
+
+# --------------------------------------------------------------
+# ⚙️ Generation
+# --------------------------------------------------------------
+def unseen_pairs(
+    space: SeedSpace, seed: int = 42, per_condition: Optional[int] = PER_CONDITION,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Distinct unseen (condition, plant) id pairs, ≤ *per_condition* random plants per condition."""
+    k = space.n_plants if per_condition is None else min(per_condition, space.n_plants)
+    if k <= 0:
+        return
+    rng = np.random.default_rng([seed, 1 << 31])  # etiket chunk'larından ayrı akış
+    step = max(1, UNSEEN_BLOCK // space.n_plants)
+    for c0 in range(0, space.n_conditions, step):
+        c1 = min(c0 + step, space.n_conditions)
+        scores = rng.random((c1 - c0, space.n_plants))
+        lo, hi = np.searchsorted(space.seen, [c0 * space.n_plants, c1 * space.n_plants])
+        scores.flat[space.seen[lo:hi] - c0 * space.n_plants] = np.inf  # görülmüş çift asla seçilmez
+
+        pick = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        picked = np.take_along_axis(scores, pick, axis=1)
+        order = np.argsort(picked, axis=1, kind="stable")
+        pick, picked = np.take_along_axis(pick, order, axis=1), np.take_along_axis(picked, order, axis=1)
+        ok = np.isfinite(picked)  # koşulun görülmemiş bitkisi k'dan azsa
+        yield np.repeat(np.arange(c0, c1), k).reshape(-1, k)[ok], pick[ok]
+
+
+def _rechunk(
+    blocks: Iterator[tuple[np.ndarray, np.ndarray]], n_rows: int, chunk_size: int,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Re‑cut (cond, plant) blocks into chunk_size pieces, n_rows in total."""
+    conds: List[np.ndarray] = []
+    plants: List[np.ndarray] = []
+    have, left = 0, n_rows
+    for cond, plant in blocks:
+        conds.append(cond)
+        plants.append(plant)
+        have += len(cond)
+        while left and have >= min(chunk_size, left):
+            c, p = np.concatenate(conds), np.concatenate(plants)
+            k = min(chunk_size, left)
+            yield c[:k], p[:k]
+            conds, plants, have, left = [c[k:]], [p[k:]], have - k, left - k
+        if not left:
+            return
+    if have:
+        yield np.concatenate(conds), np.concatenate(plants)
+
+
+def generate_chunks(
+    space: SeedSpace,
+    n_rows: int,
+    seed: int = 42,
+    chunk_size: int = CHUNK_SIZE,
+    unseen: bool = False,
+    labels: str = "random",
+    per_condition: Optional[int] = PER_CONDITION,
+) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames (OUTPUT_COLS) totalling *n_rows* synthetic feedback rows.
+
+    With *unseen*, rows are distinct pairs from :func:`unseen_pairs`; fewer
+    than *n_rows* are produced when the seed data does not have enough.
+    """
+    if labels not in ("random", "pattern"):
+        raise ValueError("labels must be 'random' or 'pattern'")
+    if unseen and space.unseen_pairs() == 0:
+        raise ValueError("Every (condition, plant) pair is already in the seed data")
+
+    pairs = _rechunk(unseen_pairs(space, seed, per_condition), n_rows, chunk_size) if unseen else None
+    produced = chunk_no = 0
+    while produced < n_rows:
+        rng = np.random.default_rng([seed, chunk_no])
+        chunk_no += 1
+        if pairs is None:
+            k = min(chunk_size, n_rows - produced)
+            cond = rng.integers(space.n_conditions, size=k)
+            plant = rng.integers(space.n_plants, size=k)
+        else:
+            block = next(pairs, None)
+            if block is None:
+                logger.warning("--unseen: only %d distinct unseen pairs (≤ %s per condition), %d requested",
+                               produced, per_condition or "all", n_rows)
+                return
+            cond, plant = block
+
+        feedback = rng.integers(2, size=len(cond), dtype=np.int8)
+        if labels == "pattern":
+            feedback = np.where(space.positive[cond], 1, np.where(space.negative[cond], 0, feedback))
+
+        frame = pd.DataFrame({col: space.conditions[col][cond] for col in CONDITION_COLS})
+        frame["suggested_plant"] = space.plants[plant]
+        frame["user_feedback"] = feedback.astype(np.int64)
+        produced += len(frame)
+        yield frame[OUTPUT_COLS]
+
+
+# --------------------------------------------------------------
+# 💾 Sinks
+# --------------------------------------------------------------
+def write_chunks(chunks: Iterator[pd.DataFrame], out: Optional[str] = None, db: bool = False) -> Dict[str, float]:
+    """Stream *chunks* to a .csv / .parquet file or the Feedback table; returns a rows/s report."""
+    if not out and not db:
+        raise ValueError("Choose an output file or the database")
+    total = 0
+    t0 = time.perf_counter()
+
+    if db:
+        from storage import get_storage
+        storage = get_storage()
+        for frame in chunks:
+            storage.bulk_insert("Feedback", OUTPUT_COLS, frame, chunk_size=len(frame) or 1)
+            total += len(frame)
+    elif out.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow – install it or write .csv") from None
+        writer = None
+        try:
+            for frame in chunks:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+                total += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        header = True
+        for frame in chunks:
+            frame.to_csv(out, mode="w" if header else "a", header=header, index=False)
+            header = False
+            total += len(frame)
+
+    seconds = time.perf_counter() - t0
+    report = {"rows": total, "seconds": seconds, "rows_per_sec": total / seconds if seconds else 0.0}
+    logger.info("✅ %d synthetic rows → %s in %.2fs (%.0f rows/s)",
+                total, "Feedback" if db else out, seconds, report["rows_per_sec"])
+    return report
+
+
+# --------------------------------------------------------------
+# 🖥️ CLI
+# --------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Dict[str, float]:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic Feedback rows")
+    parser.add_argument("--rows", type=int, default=1000, help="Number of rows to generate")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed (reproducible with the same --chunk-size)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--unseen", action="store_true", help="Only (condition, plant) pairs not in the seed data")
+    parser.add_argument("--per-condition", type=int, default=PER_CONDITION,
+                        help="--unseen: at most N new plants per condition (0 = no limit)")
+    parser.add_argument("--labels", choices=["random", "pattern"], default="random",
+                        help="random 0/1, or the positive/negative pattern rules first")
+    parser.add_argument("--source-csv", help="Seed CSV instead of the Feedback table")
+    parser.add_argument("--sep", default=";", help="Seed CSV separator")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="Output .csv or .parquet file")
+    target.add_argument("--db", action="store_true", help="Insert into the Feedback table")
+    args = parser.parse_args(argv)
+
+    space = SeedSpace(load_seed(args.source_csv, args.sep))
+    logger.info("Seed: %d conditions × %d plants, %d seen pairs",
+                space.n_conditions, space.n_plants, len(space.seen))
+    chunks = generate_chunks(space, args.rows, args.seed, args.chunk_size, args.unseen, args.labels,
+                             args.per_condition or None)
+    report = write_chunks(chunks, args.out, args.db)
+    print(f"✅ {report['rows']} kayıt üretildi ({report['seconds']:.2f} sn, {report['rows_per_sec']:.0f} satır/sn).")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,214 @@
+# retention.py – Set‑based retention for the Feedback table
+# --------------------------------------------------------------
+# Replaces "fetch every id, DELETE ... WHERE id = ? per row" with batched,
+# set‑based deletes:
+#
+#   --keep-latest N     → id below the N‑th newest id is expired
+#   --older-than DAYS   → created_at before now − DAYS is expired
+#   (both given → a row is expired if either rule says so)
+#
+# • Deletes run in batches of --batch-size rows, one commit per batch, so
+#   locks / transaction log stay small (DELETE TOP on SQL Server,
+#   id IN (SELECT … LIMIT) on SQLite).
+# • --archive feedback_archive.csv.gz → removed rows are appended to a gzip
+#   CSV first (each batch is selected by id range, then deleted by the same
+#   range; a failed commit can leave a batch archived but not deleted).
+# • --dry-run only counts; every run reports rows, batches and rows/s.
+#
+#   python retention.py --keep-latest 7000
+#   python retention.py --older-than 90 --archive feedback_archive.csv.gz
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import csv
+import datetime
+import gzip
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ortak DB katmanı (../plant_suggestion_system/storage.py): PLANT_DB_BACKEND=odbc|sqlite
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plant_suggestion_system"))
+from storage import Storage, get_storage  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+TABLE = "Feedback"
+BATCH_SIZE = 5_000
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which Feedback rows to keep; None disables a rule."""
+
+    keep_latest: Optional[int] = None
+    max_age_days: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.keep_latest is None and self.max_age_days is None:
+            raise ValueError("RetentionPolicy needs keep_latest and/or max_age_days")
+        if self.keep_latest is not None and self.keep_latest < 0:
+            raise ValueError("keep_latest must be ≥ 0")
+
+
+# --------------------------------------------------------------
+# 🔎 Expired‑row predicate
+# --------------------------------------------------------------
+def _id_threshold(storage: Storage, keep_latest: int) -> Optional[int]:
+    """Smallest id that is kept, or None if the table has ≤ keep_latest rows."""
+    if keep_latest == 0:
+        return (storage.scalar(f"SELECT MAX(id) FROM {TABLE}") or 0) + 1
+    if storage.dialect == "odbc":
+        sql = f"SELECT MIN(id), COUNT(*) FROM (SELECT TOP (?) id FROM {TABLE} ORDER BY id DESC) AS t"
+    else:
+        sql = f"SELECT MIN(id), COUNT(*) FROM (SELECT id FROM {TABLE} ORDER BY id DESC LIMIT ?) AS t"
+    row = storage.read_sql(sql, (keep_latest,)).iloc[0]
+    if int(row.iloc[1]) < keep_latest:
+        return None
+    return int(row.iloc[0])
+
+
+def expired_predicate(storage: Storage, policy: RetentionPolicy) -> Optional[Tuple[str, List[Any]]]:
+    """(WHERE clause, params) matching expired rows; None if nothing can expire."""
+    clauses, params = [], []
+    if policy.keep_latest is not None:
+        threshold = _id_threshold(storage, policy.keep_latest)
+        if threshold is not None:
+            clauses.append("id < ?")
+            params.append(threshold)
+    if policy.max_age_days is not None:
+        age = datetime.timedelta(days=policy.max_age_days)
+        clauses.append("created_at < ?")
+        if storage.dialect == "sqlite":
+            # SQLite CURRENT_TIMESTAMP = UTC metni → kesim de UTC olmalı
+            cutoff = datetime.datetime.now(datetime.timezone.utc) - age
+            params.append(cutoff.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            params.append(datetime.datetime.now() - age)  # SQL Server GETDATE() = yerel saat
+    if not clauses:
+        return None
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+# --------------------------------------------------------------
+# 🗑️ Batched delete
+# --------------------------------------------------------------
+def _delete_batch(storage: Storage, where: str, params: List[Any], batch_size: int) -> int:
+    if storage.dialect == "odbc":
+        sql = f"DELETE TOP (?) FROM {TABLE} WHERE {where}"
+        return storage.execute(sql, [batch_size, *params])
+    sql = f"DELETE FROM {TABLE} WHERE id IN (SELECT id FROM {TABLE} WHERE {where} ORDER BY id LIMIT ?)"
+    return storage.execute(sql, [*params, batch_size])
+
+
+def _archive_batch(storage: Storage, where: str, params: List[Any], batch_size: int, archive: Path) -> int:
+    """Copy the next batch of expired rows to *archive*, then delete exactly that id range."""
+    if storage.dialect == "odbc":
+        select = f"SELECT TOP (?) * FROM {TABLE} WHERE {where} ORDER BY id"
+        select_params = [batch_size, *params]
+    else:
+        select = f"SELECT * FROM {TABLE} WHERE {where} ORDER BY id LIMIT ?"
+        select_params = [*params, batch_size]
+
+    with storage.connection() as conn:  # seç + sil aynı transaction
+        cursor = conn.cursor()
+        cursor.execute(select, select_params)
+        columns = [c[0] for c in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            cursor.close()
+            return 0
+        id_pos = columns.index("id")
+        lo, hi = rows[0][id_pos], rows[-1][id_pos]
+
+        new_file = not archive.exists()
+        with gzip.open(archive, "at", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(columns)
+            writer.writerows(rows)
+
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {where} AND id BETWEEN ? AND ?", [*params, lo, hi])
+        deleted = cursor.rowcount
+        cursor.close()
+    return deleted
+
+
+def apply_retention(
+    policy: RetentionPolicy,
+    storage: Optional[Storage] = None,
+    batch_size: int = BATCH_SIZE,
+    archive: Optional[str | Path] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Delete expired Feedback rows in batches; returns a timing / count report."""
+    storage = storage or get_storage()
+    t0 = time.perf_counter()
+    deleted = batches = 0
+
+    predicate = expired_predicate(storage, policy)
+    if predicate is not None:
+        where, params = predicate
+        if dry_run:
+            deleted = int(storage.scalar(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params) or 0)
+        else:
+            archive_path = Path(archive) if archive else None
+            while True:
+                if archive_path is not None:
+                    n = _archive_batch(storage, where, params, batch_size, archive_path)
+                else:
+                    n = _delete_batch(storage, where, params, batch_size)
+                if n <= 0:
+                    break
+                deleted += n
+                batches += 1
+                if n < batch_size:
+                    break
+
+    seconds = time.perf_counter() - t0
+    report = {
+        "deleted": deleted,
+        "batches": batches,
+        "seconds": seconds,
+        "rows_per_sec": deleted / seconds if seconds else 0.0,
+        "dry_run": dry_run,
+        "archive": str(archive) if archive and not dry_run else None,
+    }
+    logger.info(
+        "🧹 Retention (%s) – %s %d rows in %d batches, %.2fs (%.0f rows/s)",
+        storage.dialect, "would delete" if dry_run else "deleted", deleted, batches, seconds, report["rows_per_sec"],
+    )
+    return report
+
+
+# --------------------------------------------------------------
+# 🖥️ CLI
+# --------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delete expired Feedback rows in set-based batches")
+    parser.add_argument("--keep-latest", type=int, help="Keep only the newest N rows (by id)")
+    parser.add_argument("--older-than", type=float, help="Delete rows whose created_at is older than DAYS")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--archive", help="Append deleted rows to this .csv.gz file first")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted")
+    args = parser.parse_args(argv)
+    if args.keep_latest is None and args.older_than is None:
+        parser.error("give --keep-latest and/or --older-than")
+
+    policy = RetentionPolicy(keep_latest=args.keep_latest, max_age_days=args.older_than)
+    report = apply_retention(policy, batch_size=args.batch_size, archive=args.archive, dry_run=args.dry_run)
+    verb = "silinecek" if args.dry_run else "silindi"
+    print(f"✅ {report['deleted']} kayıt {verb} ({report['batches']} parti, "
+          f"{report['seconds']:.2f} sn, {report['rows_per_sec']:.0f} satır/sn).")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -1,27 +1,12 @@
-import pyodbc
+# sysntetik_veri.py – Feedback tablosunda en yeni 7000 kaydı bırakır, gerisini siler.
+# Artık retention.py'nin ince bir sarmalayıcısı (toplu, küme tabanlı DELETE);
+# ek argümanlar (ör. --archive feedback_archive.csv.gz, --dry-run) iletilir.
+import sys
 
-conn_str = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=localhost\\SQLEXPRESS;"
-    "DATABASE=Smart_Plant_Recomandation_System;"
-    "Trusted_Connection=yes;"
-)
+from retention import main
+from storage import use_local_sqlserver  # retention ortak DB katmanını yola ekler
 
-conn = pyodbc.connect(conn_str)
-cursor = conn.cursor()
+use_local_sqlserver()  # varsayılan: localhost\SQLEXPRESS
 
-# En yüksek ID'leri al
-cursor.execute("SELECT id FROM Feedback ORDER BY id DESC")
-ids = [row[0] for row in cursor.fetchall()]
-
-# 5000 kayıt bırak, diğerlerini sil
-ids_to_delete = ids[7000:]  # en son 5000 kayıt hariç
-
-for del_id in ids_to_delete:
-    cursor.execute("DELETE FROM Feedback WHERE id = ?", del_id)
-
-conn.commit()
-cursor.close()
-conn.close()
-
-print(f"✅ {len(ids_to_delete)} kayıt silindi. Yaklaşık 5000 kayıt kaldı.")
+if __name__ == "__main__":
+    main(["--keep-latest", "7000", *sys.argv[1:]])
@@ -1,22 +1,20 @@
 import joblib
 import matplotlib.pyplot as plt
-import pandas as pd
-import pyodbc
 from sklearn.metrics import roc_curve, roc_auc_score
 
 # -------------------------------
-# MSSQL bağlantısı
+# Veritabanı: ortak storage katmanı (../plant_suggestion_system/storage.py)
 # -------------------------------
-def sql_connect():
-    return pyodbc.connect(
-        r"DRIVER={ODBC Driver 17 for SQL Server};"
-        r"SERVER=localhost\SQLEXPRESS;"
-        r"DATABASE=Smart_Plant_Recomandation_System;"
-        r"Trusted_Connection=yes;"
-    )
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plant_suggestion_system"))
+from storage import get_storage, use_local_sqlserver  # noqa: E402
+
+use_local_sqlserver()  # varsayılan: localhost\SQLEXPRESS
+
 
 def load_feedback_data():
-    conn = sql_connect()
     query = '''
     SELECT
         area_size,
@@ -32,8 +30,7 @@ def load_feedback_data():
         user_feedback
     FROM Feedback
     '''
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = get_storage().read_sql(query)
     return df
 
 # -------------------------------
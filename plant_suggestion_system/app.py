@@ -8,15 +8,18 @@
 
 import streamlit as st
 import pandas as pd
-import joblib
 import os
 import subprocess
 import numpy as np
 import random  
 import streamlit as st
-from typing import Tuple
-from data_handling import load_plants, add_feedback, sql_connect
-from rule_engine import RuleEngine
+from typing import List, Tuple
+from data_handling import count_positive_feedback
+from feedback_queue import get_feedback_queue, submit_feedback
+from rule_engine import PROFILE_SPACE, canonical_profile
+from candidate_table import lookup_candidates, rebuild_in_background
+from feature_encoder import CompiledEncoder
+from resources import get_plants, get_rule_engine, get_scoring_models
 
 import sys
 import logging
@@ -29,23 +32,106 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-from sklearn.feature_extraction import DictVectorizer
-
-feedback_model = joblib.load("models/feedback_model.pkl")
-vectorizer: DictVectorizer = joblib.load("models/feedback_vec.pkl")
-
 logging.basicConfig(level=logging.DEBUG)
 
-def align_features_with_vectorizer(record: dict, vectorizer: DictVectorizer):
-    """Ensure input features match the trained vectorizer's expected features."""
-    temp_df = pd.DataFrame([record])
+TOP_K = 5  # ilk 5 yüksek skorlu bitki arasından seçeceğiz
+
+def align_features_with_vectorizer(records: List[dict] | dict, encoder: CompiledEncoder):
+    """Encode one or many records with the compiled one‑hot encoder (no pandas)."""
+    if isinstance(records, dict):
+        records = [records]
     try:
-        encoded = vectorizer.transform(temp_df.to_dict(orient="records"))
-        return encoded
+        return encoder.transform(records)
     except Exception as e:
-        logging.warning("⚠️ DictVectorizer transform hatası: %s", e)
+        logging.warning("⚠️ Encoder transform hatası: %s", e)
         raise
 
+
+def _predict_scores(user_input: dict, plants: List[str]) -> np.ndarray:
+    """Positive‑class probabilities for *plants*, one transform + one predict_proba."""
+    profile = dict(user_input)
+    if "waterring_frequency" in profile:
+        profile["watering_frequency"] = profile.pop("waterring_frequency")
+
+    records = [{**profile, "suggested_plant": plant} for plant in plants]
+    models = get_scoring_models()
+    if models.score_table is not None:
+        return models.score_table.score(records)
+    encoded = align_features_with_vectorizer(records, models.encoder)
+    return np.asarray(models.model.predict_proba(encoded)[:, 1], dtype=float)
+
+
+def score_plants(user_input: dict, plants: List[str]) -> List[Tuple[str, float]]:
+    """Score every plant for *user_input* with one transform + one predict_proba call."""
+    if not plants:
+        return []
+    try:
+        probas = _predict_scores(user_input, plants)
+    except Exception as e:
+        logger.error("❌ ML skorlamasında hata oluştu (%d bitki): %s", len(plants), str(e))
+        return []
+
+    scores = [(plant, float(proba)) for plant, proba in zip(plants, probas)]
+    logger.debug("🔢 ML skorları (%d): %s", len(scores), scores[:10])
+    return scores
+
+
+def rank_catalog(user_input: dict, plants: List[str], top_k: int = TOP_K) -> List[Tuple[str, float]]:
+    """Score the whole catalog in one batch and return the *top_k* best, best first.
+
+    Only the top_k slice is sorted (argpartition), so the fallback costs one
+    batched predict_proba regardless of the catalog size.
+    """
+    if not plants:
+        return []
+    try:
+        probas = _predict_scores(user_input, plants)
+    except Exception as e:
+        logger.error("❌ Katalog skorlamasında hata oluştu (%d bitki): %s", len(plants), str(e))
+        return []
+
+    k = min(top_k, len(plants))
+    top_idx = np.argpartition(-probas, k - 1)[:k]
+    top_idx = top_idx[np.argsort(-probas[top_idx], kind="stable")]
+    ranked = [(plants[i], float(probas[i])) for i in top_idx]
+    logger.info("🌍 Katalog fallback – %d bitki skorlandı, en iyi %d: %s", len(plants), k, ranked)
+    return ranked
+
+
+def candidate_stream(user_input: dict) -> dict:
+    """Session paging state for this profile on the current KB version ("show more").
+
+    Holds the RuleEngine.iter_candidate_pages generator and the scored, not yet
+    shown rest of the current page; a new profile or a KB hot reload (new
+    snapshot digest) starts a fresh stream.
+    """
+    key = (canonical_profile(user_input), get_rule_engine().kb.snapshot().digest)
+    stream = st.session_state.get("candidate_stream")
+    if stream is None or stream["key"] != key:
+        stream = {"key": key, "pages": None, "buffer": []}
+        st.session_state["candidate_stream"] = stream
+    return stream
+
+
+def next_suggestion(user_input: dict, stream: dict, past: List[str],
+                    known_plants: set) -> Tuple[str, float] | None:
+    """Random unshown plant of the buffered page; the next page is scored only once it runs dry."""
+    while True:
+        buffer = [(p, s) for p, s in stream["buffer"] if p not in past and p in known_plants]
+        if buffer:
+            suggestion = random.choice(buffer)
+            buffer.remove(suggestion)
+            stream["buffer"] = buffer
+            past.append(suggestion[0])
+            return suggestion
+        page = next(stream["pages"], None)
+        if page is None:  # akış tükendi
+            stream["buffer"] = []
+            return None
+        page = [p for p in page if p not in past and p in known_plants]
+        stream["buffer"] = sorted(score_plants(user_input, page), key=lambda x: x[1], reverse=True)
+        logger.info("📄 Sonraki aday sayfası: %s", stream["buffer"])
+
 #logging.info("🎯 Modelin beklediği özellikler: %s", vectorizer.feature_names_)
 
 # --------------------------------------------------------------
@@ -138,11 +224,8 @@ def check_and_retrain_if_needed(threshold: int =3)-> bool:
     """Retrain model when accepted‑feedback count is divisible by *threshold*."""
     logger.debug("Retrain ihtiyacı kontrol ediliyor (threshold: %d)", threshold)
     try:
-        conn = sql_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM Feedback WHERE user_feedback = 1")
-        count = cur.fetchone()[0]
-        conn.close()
+        # DB'deki + kuyrukta henüz yazılmamış kabul edilmiş feedback'ler (flush beklemeden)
+        count = get_feedback_queue().positive_count(count_positive_feedback)
         logger.info("Toplam pozitif feedback: %s", count)
 
         if count and count % threshold == 0:
@@ -169,8 +252,10 @@ def check_and_retrain_if_needed(threshold: int =3)-> bool:
 
                # 4. KB güncelle
             from kb_updater import update_knowledge_base
-            update_knowledge_base("parsed_rules.json", "knowledge_base.json")
+            # Senkron sıkıştırma: aday tablosu KB'nin son hâlinden (digest) derlensin
+            update_knowledge_base("parsed_rules.json", "knowledge_base.json", compact_async=False)
             logger.info("Bilgi tabanı güncellendi.")
+            rebuild_in_background(get_rule_engine(), top_n=TOP_K)  # candidate_table'ı yeni KB'ye göre yeniden derle
 
             st.success("✅ Model retrained & rules updated.")
             return True
@@ -195,28 +280,28 @@ def render_preference_form():
     col1, col2 = st.columns(2)
     
     with col1:
-        area_size = st.selectbox("Space Size", ["Mini", "Small", "Medium", "Large"])
+        area_size = st.selectbox("Space Size", PROFILE_SPACE["area_size"])
         sunlight_need = st.selectbox(
             "Sunlight Requirement",
-            ["Can live in shade", "1-2 hours daily", "Bright indirect light", "6+ hours"],
+            PROFILE_SPACE["sunlight_need"],
         )
-        environment_type = st.selectbox("Environment Type", ["Indoor", "Outdoor", "Semi-outdoor"])
-        climate_type = st.selectbox("Climate Type", ["All seasons", "Spring", "Summer", "Winter"])
+        environment_type = st.selectbox("Environment Type", PROFILE_SPACE["environment_type"])
+        climate_type = st.selectbox("Climate Type", PROFILE_SPACE["climate_type"])
         watering_frequency = st.selectbox(
             "Watering Frequency",
-            ["Daily", "Weekly", "Bi-weekly", "Every 2-3 days", "Monthly"]
+            PROFILE_SPACE["watering_frequency"]
         )
     
     with col2:
         fertilizer_frequency = st.selectbox(
-            "Fertilizer Frequency", ["Monthly", "1-2 times a year", "Never needed"]
+            "Fertilizer Frequency", PROFILE_SPACE["fertilizer_frequency"]
         )
         pesticide_frequency = st.selectbox(
-            "Pesticide Frequency", ["Monthly", "1-2 times a year", "Never needed"]
+            "Pesticide Frequency", PROFILE_SPACE["pesticide_frequency"]
         )
         
-        has_pet = st.radio("Do you have pets?", ["Yes", "No"])
-        has_child = st.radio("Do you have children?", ["Yes", "No"])
+        has_pet = st.radio("Do you have pets?", PROFILE_SPACE["has_pet"])
+        has_child = st.radio("Do you have children?", PROFILE_SPACE["has_child"])
         
 
         
@@ -242,184 +327,79 @@ with col2:
 # Eğer kullanıcı öner butonuna bastıysa
 if recommend_clicked:
     logger.info(" Öner butonuna tıklandı.")
-    df = load_plants()
+    df = get_plants()
     if df.empty:
         logger.error(" Bitki verisi yüklenemedi.")
         st.error(" Could not load plant data — check DB connection.")
         st.stop()
 
-    rule_engine = RuleEngine(df)
-    candidates = rule_engine.get_candidates(user_input, top_n=5)
-    logger.info("🎯 RuleEngine aday bitkiler: %s", candidates)
-
-    logger.info("🧠 ML skorlama başlatılıyor. %d aday değerlendirilecek.", len(candidates))
-
-    # ML skorlama yapılacak bitki listesi (fallback destekli)
-    scores = []
-
-    if not candidates:
-        logger.warning("⚠️ Kural tabanlı eşleşme bulunamadı, ML fallback başlatılıyor.")
-        st.info("🔍 No rule-based match found. Trying best guess with ML...")
-        for _, row in df.iterrows():
-            record = {**user_input, "suggested_plant": row["plant_name"]}
-
-            if "waterring_frequency" in record:
-               record["watering_frequency"] = record.pop("waterring_frequency")
-
-
-
-                        # DEBUG: Feature kontrolü yap
-            expected_features = set(vectorizer.feature_names_)
-            actual_features = set(record.keys())
-
-            missing = expected_features - actual_features
-            extra = actual_features - expected_features
-
-            if missing:
-                logger.warning("🚨 Eksik featurelar: %s", missing)
-            if extra:
-                logger.warning("⚠️ Fazladan featurelar: %s", extra)
-
-
-            try:
-                record_df = pd.DataFrame([record])
-
-                record_encoded = align_features_with_vectorizer(record, vectorizer)
-                proba = feedback_model.predict_proba(record_encoded)[0, 1]
-
-
-                logger.debug("🔢 ML skor: %s → %.3f", proba)
-                scores.append(( proba))
-            except Exception as e:
-              logger.error("❌ ML skorlamasında hata oluştu (%s): %s",  str(e))
+    rule_engine = get_rule_engine()
+    catalog = rule_engine.catalog  # yüklemede bir kez hazırlanan bitki listesi
+    known_plants = set(catalog)
+    stream = candidate_stream(user_input)
 
-            scores.append((row["plant_name"], proba))
+    # Yeni profil / KB sürümü → ilk sayfa (candidate_table ya da get_candidates ile aynı)
+    if stream["pages"] is None:
+        candidates = lookup_candidates(rule_engine, user_input, top_n=TOP_K)
+        logger.info("🎯 RuleEngine aday bitkiler: %s", candidates)
+        stream["pages"] = rule_engine.iter_candidate_pages(user_input, TOP_K, first_page=candidates)
 
-            logger.debug("🔢 ML skor: %s → %.3f",  proba)
-
-    else:
-        for plant in candidates:
-            record = {**user_input, "suggested_plant": plant}
-
-            
-
-
-            # DEBUG: Feature kontrolü yap
-            expected_features = set(vectorizer.feature_names_)
-            actual_features = set(record.keys())
-
-            missing = expected_features - actual_features
-            extra = actual_features - expected_features
-
-           
-
-
-            try:
-                record_df = pd.DataFrame([record])
-                record_encoded = align_features_with_vectorizer(record, vectorizer)
-                proba = feedback_model.predict_proba(record_encoded)[0, 1]
-
-                logger.debug("🔢 ML skor: %s → %.3f", plant, proba)
-                scores.append((plant, proba))
-            except Exception as e:
-                logger.error("❌ ML skorlamasında hata oluştu (%s): %s", plant, str(e))
-
-            scores.append((plant, proba))
-            logger.debug("🔢 ML skor: %s → %.3f", plant, proba)
-
-
-        # Eşleşme veritabanında yoksa fallback için tekrar tüm df taranır
-        scores = sorted(scores, key=lambda x: x[1], reverse=True)
-        fallback_row = None
-        for plant, score in scores:
-            match = df[df["plant_name"] == plant]
-            if not match.empty:
-                fallback_row = match.iloc[0]
-                best_plant = plant
-                best_score = score
-                logger.info("✅ Kural + ML ile bulunan öneri: %s (skor: %.3f)", best_plant, best_score)
-                break
-        if fallback_row is None:
-            st.info("⚠️ Candidates found but not in DB. ML fallback triggered.")
-            scores.clear()
-            for _, row in df.iterrows():
-                record = {**user_input, "suggested_plant": row["plant_name"]}
-
-                
+        logger.info("🧠 ML skorlama başlatılıyor. %d aday değerlendirilecek.", len(candidates))
 
+        # ML skorlama yapılacak bitki listesi (fallback destekli)
+        scores = []
 
+        if not candidates:
+            logger.warning("⚠️ Kural tabanlı eşleşme bulunamadı, ML fallback başlatılıyor.")
+            st.info("🔍 No rule-based match found. Trying best guess with ML...")
+            scores = rank_catalog(user_input, catalog)
 
-                # DEBUG: Feature kontrolü yap
-                expected_features = set(vectorizer.feature_names_)
-                actual_features = set(record.keys())
+        else:
+            scores = sorted(score_plants(user_input, candidates), key=lambda x: x[1], reverse=True)
 
-                missing = expected_features - actual_features
-                extra = actual_features - expected_features
+            # Eşleşme veritabanında yoksa fallback için tüm katalog taranır
+            if not any(plant in known_plants for plant, _ in scores):
+                st.info("⚠️ Candidates found but not in DB. ML fallback triggered.")
+                scores = rank_catalog(user_input, catalog)
 
-               
-
-
-                try:
-                    record_df = pd.DataFrame([record])
-                    record_encoded = align_features_with_vectorizer(record, vectorizer)
-                    proba = feedback_model.predict_proba(record_encoded)[0, 1]
-
-                    logger.debug("🔢 ML skor: %s → %.3f", plant, proba)
-                    scores.append((plant, proba))
-                except Exception as e:
-                   logger.error("❌ ML skorlamasında hata oluştu (%s): %s", plant, str(e))
-
-                scores.append((row["plant_name"], proba))
-
-    # En iyi sonucu bul ve göster
-    if scores:
-                
-
-        TOP_K = 5  # ilk 5 yüksek skorlu bitki arasından seçeceğiz
-
-        top_k = scores[:TOP_K] if len(scores) >= TOP_K else scores
-
-        # Geçmiş önerilen bitkiler tutulur (session bazlı)
-        past = st.session_state.get("past_recommendations", [])
+        if not scores:
+            st.session_state.pop("candidate_stream", None)
+            st.error("❌ Unable to generate a recommendation.")
+            st.stop()
+        stream["buffer"] = scores[:TOP_K]
 
-        # Daha önce önerilmemiş olanı rastgele seç
-        suggestion = None
-        for plant, score in random.sample(top_k, len(top_k)):
-            if plant not in past:
-                suggestion = (plant, score)
-                past.append(plant)
-                break
+    # Geçmiş önerilen bitkiler tutulur (session bazlı)
+    past = st.session_state.get("past_recommendations", [])
 
-        st.session_state["past_recommendations"] = past
+    # Sayfanın gösterilmemiş kalanından rastgele seç; bitince sonraki sayfa ("show more")
+    suggestion = next_suggestion(user_input, stream, past, known_plants)
+    st.session_state["past_recommendations"] = past
 
-        if suggestion is None:
-            st.warning(" All top suggestions already shown. Try different input.")
-            st.stop()
+    if suggestion is None:
+        st.warning(" All top suggestions already shown. Try different input.")
+        st.stop()
 
-        best_plant, best_score = suggestion
+    best_plant, best_score = suggestion
 
-        logger.info(" En iyi öneri: %s (Skor: %.3f)", best_plant, best_score)
+    logger.info(" En iyi öneri: %s (Skor: %.3f)", best_plant, best_score)
 
-        # Eşleşen bitkiyi robust şekilde bul
-        match = df[df["plant_name"].str.strip().str.lower() == best_plant.strip().lower()]
-        if match.empty:
-            st.error(f" '{best_plant}' için bitki detayları bulunamadı.")
-            st.stop()
-        row = match.iloc[0]
+    # Eşleşen bitkiyi robust şekilde bul
+    match = df[df["plant_name"].str.strip().str.lower() == best_plant.strip().lower()]
+    if match.empty:
+        st.error(f" '{best_plant}' için bitki detayları bulunamadı.")
+        st.stop()
+    row = match.iloc[0]
 
-        logger.debug(" Bitki veri satırı bulundu: %s", row.to_dict())
+    logger.debug(" Bitki veri satırı bulundu: %s", row.to_dict())
 
-        img_url = row["image_url"]
+    img_url = row["image_url"]
 
-        st.session_state["recommended_plant"] = {
-            "plant_name": best_plant,
-            "description": row["description"],
-            "image_url": img_url,
-        }
-        st.session_state["user_input"] = user_input
-    else:
-        st.error("❌ Unable to generate a recommendation.")
-        st.stop()
+    st.session_state["recommended_plant"] = {
+        "plant_name": best_plant,
+        "description": row["description"],
+        "image_url": img_url,
+    }
+    st.session_state["user_input"] = user_input
 
 # Eğer tavsiye varsa göster
 plant_dict = st.session_state.get("recommended_plant")
@@ -454,7 +434,7 @@ if plant_dict:
     if submit:
         try:
             feedback_val = 1 if fb_choice == "Yes" else 0
-            add_feedback(
+            submit_feedback(  # write-behind: DB yazımı arka planda, toplu
                 st.session_state["user_input"],
                 plant_dict["plant_name"],
                 feedback_val,
@@ -0,0 +1,250 @@
+# candidate_table.py – Precompiled candidate lookup for the whole profile space
+# --------------------------------------------------------------
+# The preference form only produces a finite set of profiles (PROFILE_SPACE,
+# ≈35k combinations). This module runs RuleEngine.get_candidates once per
+# combination offline and stores the answers as a dense int matrix:
+#
+#   candidate_table.npy   → shape (n_profiles, top_n), plant ids, -1 = boş
+#   candidate_table.json  → attribute order, plant names, KB / catalog hashes
+#
+# At serving time a profile is turned into a row number with mixed‑radix
+# index arithmetic and the row is read from a memory‑mapped .npy file.
+# If the KB or plant catalog changed since compilation, lookups fall back
+# to RuleEngine.get_candidates (logged once per KB version at WARNING). The
+# app's retrain rebuilds the table in the background (rebuild_in_background);
+# after editing the KB or plants by hand, recompile with the CLI below.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from kb_journal import atomic_write_bytes, atomic_write_json
+from rule_engine import PROFILE_SPACE, RuleEngine, catalog_digest  # noqa: F401 (re-export)
+import rule_engine
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TABLE_PATH = "models/candidate_table.npy"
+
+# --------------------------------------------------------------
+# 🏗️ Offline compile step
+# --------------------------------------------------------------
+def _meta_path(table_path: str | Path) -> Path:
+    return Path(table_path).with_suffix(".json")
+
+
+def compile_candidate_table(
+    engine: RuleEngine,
+    out_path: str | Path = DEFAULT_TABLE_PATH,
+    top_n: int = 5,
+) -> Path:
+    """Evaluate *engine* for every profile in PROFILE_SPACE and save the table."""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    attributes = list(PROFILE_SPACE)
+    n_profiles = int(np.prod([len(v) for v in PROFILE_SPACE.values()]))
+
+    kb_sha256 = engine.kb.snapshot().digest  # tablo bu KB sürümüne bağlanır
+    plant_ids: Dict[str, int] = {}
+    plants: List[str] = []
+    rows: List[List[int]] = []
+
+    # Her profil için INFO log basmamak adına geçici olarak sustur
+    prev_level = rule_engine.logger.level
+    rule_engine.logger.setLevel(logging.WARNING)
+    started = time.perf_counter()
+    try:
+        for combo in itertools.product(*PROFILE_SPACE.values()):
+            cands = engine.get_candidates(dict(zip(attributes, combo)), top_n=top_n)
+            row = []
+            for plant in cands:
+                if plant not in plant_ids:
+                    plant_ids[plant] = len(plants)
+                    plants.append(plant)
+                row.append(plant_ids[plant])
+            rows.append(row + [-1] * (top_n - len(row)))
+    finally:
+        rule_engine.logger.setLevel(prev_level)
+
+    dtype = np.int16 if len(plants) < np.iinfo(np.int16).max else np.int32
+    table = np.asarray(rows, dtype=dtype).reshape(n_profiles, top_n)
+    buf = io.BytesIO()
+    np.save(buf, table)
+    atomic_write_bytes(out_path, buf.getvalue())  # önce tablo, sonra meta: arada okuyan eski meta'yı görür → bayat sayar
+
+    meta = {
+        "attributes": PROFILE_SPACE,
+        "top_n": top_n,
+        "plants": plants,
+        "kb_sha256": kb_sha256,
+        "veto_mode": engine.veto_mode,
+        "catalog_sha256": engine.catalog_sha256,
+    }
+    atomic_write_json(_meta_path(out_path), meta)
+
+    logger.info(
+        "Candidate table compiled – %d profiles × top %d, %d plants, %.1fs → %s",
+        n_profiles, top_n, len(plants), time.perf_counter() - started, out_path,
+    )
+    return out_path
+
+
+def rebuild_in_background(
+    engine: RuleEngine,
+    out_path: str | Path = DEFAULT_TABLE_PATH,
+    top_n: int = 5,
+) -> threading.Thread:
+    """Reload *engine*'s KB and recompile the table on a daemon thread (after a KB update)."""
+    def run() -> None:
+        try:
+            engine.kb.reload()
+            compile_candidate_table(engine, out_path, top_n)
+        except Exception as exc:
+            logger.warning("Candidate table rebuild failed (%s) – lookups use RuleEngine until "
+                           "`python candidate_table.py` is run", exc)
+
+    thread = threading.Thread(target=run, name="candidate-table-rebuild", daemon=True)
+    thread.start()
+    return thread
+
+
+# --------------------------------------------------------------
+# ⚡ Serving side
+# --------------------------------------------------------------
+class CandidateTable:
+    """Memory‑mapped view over a compiled candidate table."""
+
+    def __init__(self, table: np.ndarray, meta: dict) -> None:
+        self.table = table
+        self.top_n: int = meta["top_n"]
+        self.plants: List[str] = meta["plants"]
+        self.kb_sha256: str = meta["kb_sha256"]
+        self.veto_mode: str = meta.get("veto_mode", "off")
+        self.catalog_sha256: str = meta["catalog_sha256"]
+
+        self.attributes: List[str] = list(meta["attributes"])
+        self._codes: List[Dict[str, int]] = [
+            {val: i for i, val in enumerate(meta["attributes"][a])} for a in self.attributes
+        ]
+        # Mixed‑radix stride'lar: son özellik en hızlı değişen (itertools.product sırası)
+        radices = [len(c) for c in self._codes]
+        self._strides = [int(np.prod(radices[i + 1:])) for i in range(len(radices))]
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_TABLE_PATH) -> Optional["CandidateTable"]:
+        """Open the artifact read‑only via mmap; None if it does not exist."""
+        path = Path(path)
+        meta_path = _meta_path(path)
+        if not path.exists() or not meta_path.exists():
+            return None
+        with meta_path.open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), meta)
+
+    def is_fresh(self, engine: RuleEngine, top_n: int) -> bool:
+        """True if the table was compiled from the engine's current KB snapshot, veto mode and catalog."""
+        return (
+            top_n == self.top_n
+            and self.veto_mode == engine.veto_mode
+            and self.kb_sha256 == engine.kb.snapshot().digest
+            and self.catalog_sha256 == engine.catalog_sha256
+        )
+
+    def row_index(self, user_input: Dict[str, str]) -> Optional[int]:
+        """Profile → table row, or None if the profile is outside PROFILE_SPACE."""
+        if len(user_input) != len(self.attributes):
+            return None
+        idx = 0
+        for attr, codes, stride in zip(self.attributes, self._codes, self._strides):
+            code = codes.get(user_input.get(attr))
+            if code is None:
+                return None
+            idx += code * stride
+        return idx
+
+    def lookup(self, user_input: Dict[str, str]) -> Optional[List[str]]:
+        idx = self.row_index(user_input)
+        if idx is None:
+            return None
+        return [self.plants[i] for i in self.table[idx] if i >= 0]
+
+
+_TABLES: Dict[str, Tuple[Tuple[int, ...], Optional[CandidateTable]]] = {}
+_STALE_WARNED: set = set()  # (tablo, KB digest) başına bir WARNING
+
+
+def _open_table(path: str | Path) -> Optional[CandidateTable]:
+    """Process‑wide cache of the mmap, reopened only when the table or its meta changes."""
+    path = str(path)
+    try:
+        st, meta_st = os.stat(path), os.stat(_meta_path(path))
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size, meta_st.st_mtime_ns, meta_st.st_size)
+    cached = _TABLES.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    table = CandidateTable.load(path)
+    _TABLES[path] = (stamp, table)
+    return table
+
+
+def lookup_candidates(
+    engine: RuleEngine,
+    user_input: Dict[str, str],
+    top_n: int = 5,
+    table_path: str | Path = DEFAULT_TABLE_PATH,
+) -> List[str]:
+    """Serve candidates from the compiled table; fall back to the rule engine."""
+    table = _open_table(table_path)
+    if table is None:
+        logger.info("Candidate table missing – using RuleEngine.")
+    elif table.is_fresh(engine, top_n):
+        cands = table.lookup(user_input)
+        if cands is not None:
+            logger.info("📦 Candidate table hit: %s", cands)
+            return cands
+    else:
+        warned = (str(table_path), engine.kb.snapshot().digest)
+        if warned not in _STALE_WARNED:
+            _STALE_WARNED.add(warned)
+            logger.warning("Candidate table %s is stale (KB, catalog or veto mode changed) – using RuleEngine "
+                           "until it is rebuilt: python candidate_table.py --kb %s", table_path, engine.kb.kb_path)
+    return engine.get_candidates(user_input, top_n=top_n)
+
+
+# --------------------------------------------------------------
+# 🖥️ CLI: python candidate_table.py --kb knowledge_base.json [--csv plants.csv]
+# --------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Compile the candidate lookup table")
+    parser.add_argument("--kb", default="knowledge_base.json", help="Path to KB JSON")
+    parser.add_argument("--csv", help="plants.csv instead of the plants DB table")
+    parser.add_argument("--out", default=DEFAULT_TABLE_PATH, help="Output .npy path")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--veto", choices=rule_engine.VETO_MODES, default="off", help="Negative-rule veto mode")
+    args = parser.parse_args()
+
+    if args.csv:
+        df_plants = pd.read_csv(args.csv)
+    else:
+        from data_handling import load_plants
+        df_plants = load_plants()
+
+    compile_candidate_table(RuleEngine(df_plants, kb_path=args.kb, veto_mode=args.veto), args.out, args.top_n)
@@ -1,10 +1,11 @@
 import pandas as pd
-import pyodbc
 import logging
 import datetime
 import joblib
 from sklearn.preprocessing import OrdinalEncoder
 
+from storage import get_storage
+
 # Profiling library import: try pandas_profiling, fallback to ydata_profiling
 try:
     from pandas_profiling import ProfileReport
@@ -18,19 +19,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # --------------------------------------------------------------
 # Database Connection
 # --------------------------------------------------------------
-def sql_connect():
-    try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 17 for SQL Server};"
-            "SERVER=LAPTOP-7GK6MUOG\\SQLEXPRESS;"
-            "DATABASE=Smart_Plant_Recomandation_System;"
-            "Trusted_Connection=yes;"
-        )
-        logging.info("✅ Database connection established.")
-        return conn
-    except Exception as e:
-        logging.error(f"❌ Database connection failed: {e}")
-        raise
+# Bağlantılar storage.py'deki ortak havuzdan gelir (PLANT_DB_BACKEND=odbc|sqlite).
 
 # --------------------------------------------------------------
 # Plant Data Functions
@@ -39,10 +28,8 @@ def load_plants() -> pd.DataFrame:
     """
     Load plant records and perform basic cleaning.
     """
-    conn = None
     try:
-        conn = sql_connect()
-        df = pd.read_sql("SELECT * FROM plants", conn)
+        df = get_storage().read_sql("SELECT * FROM plants")
         logging.info(f"✅ {len(df)} plant records loaded.")
 
         # Basic cleaning: lowercase columns, strip whitespace\ n        df.columns = df.columns.str.strip().str.lower()
@@ -55,19 +42,27 @@ def load_plants() -> pd.DataFrame:
     except Exception as e:
         logging.error(f"❌ Failed to load plant data: {e}")
         return pd.DataFrame()
-    finally:
-        if conn:
-            conn.close()
-            logging.info("🛑 Database connection closed after loading plants.")
+
+def plants_fingerprint() -> tuple:
+    """
+    Cheap change detector for the plants table (row count + aggregate checksum).
+    """
+    return get_storage().plants_fingerprint()
 
 # --------------------------------------------------------------
 # Feedback Data Handling
 # --------------------------------------------------------------
+def count_positive_feedback() -> int:
+    """
+    Number of accepted (user_feedback = 1) recommendations.
+    """
+    return int(get_storage().scalar("SELECT COUNT(*) FROM Feedback WHERE user_feedback = 1") or 0)
+
+
 def fetch_feedback_data() -> pd.DataFrame:
     """
     Fetch feedback records including timestamp.
     """
-    conn = sql_connect()
     query = '''
         SELECT
             area_size, sunlight_need, environment_type, climate_type,
@@ -75,8 +70,7 @@ def fetch_feedback_data() -> pd.DataFrame:
             has_pet, has_child, suggested_plant, user_feedback, created_at
         FROM Feedback
     '''
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = get_storage().read_sql(query)
     logging.info(f"Fetched {len(df)} feedback records.")
     return df
 
@@ -163,18 +157,8 @@ def encode_categorical(df: pd.DataFrame, encoder_path: str = 'models/encoder.pkl
 
 # --------------------------------------------------------------
 
-def add_feedback(user_input: dict, suggested_plant: str, user_feedback: int) -> None:
-    """
-    Kullanıcının geri bildirimini Feedback tablosuna yazar.
-    user_input: render_preference_form() çıktısı dict
-    suggested_plant: str, önerilen bitki adı
-    user_feedback: int, 1=beğendi, 0=beğenmedi
-    """
-    conn = sql_connect()
-    cursor = conn.cursor()
-
-    # INSERT cümlesi; created_at sütunu DB'de DEFAULT GETDATE() ise onu atlayabilirsiniz
-    insert_sql = """
+# INSERT cümlesi; created_at sütunu DB'de DEFAULT GETDATE() ise onu atlayabilirsiniz
+FEEDBACK_INSERT_SQL = """
     INSERT INTO Feedback (
         area_size,
         sunlight_need,
@@ -188,9 +172,14 @@ def add_feedback(user_input: dict, suggested_plant: str, user_feedback: int) ->
         suggested_plant,
         user_feedback
     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
+"""
+
 
-    params = (
+def feedback_params(user_input: dict, suggested_plant: str, user_feedback: int) -> tuple:
+    """
+    FEEDBACK_INSERT_SQL parametreleri (sütun sırasıyla).
+    """
+    return (
         user_input["area_size"],
         user_input["sunlight_need"],
         user_input["environment_type"],
@@ -201,10 +190,23 @@ def add_feedback(user_input: dict, suggested_plant: str, user_feedback: int) ->
         user_input["has_pet"],
         user_input["has_child"],
         suggested_plant,
-        user_feedback
+        int(user_feedback),
     )
 
-    cursor.execute(insert_sql, params)
-    conn.commit()
-    cursor.close()
-    conn.close()
+
+def add_feedback(user_input: dict, suggested_plant: str, user_feedback: int) -> None:
+    """
+    Kullanıcının geri bildirimini Feedback tablosuna yazar (senkron).
+    user_input: render_preference_form() çıktısı dict
+    suggested_plant: str, önerilen bitki adı
+    user_feedback: int, 1=beğendi, 0=beğenmedi
+    Uygulama bunun yerine feedback_queue.py üzerinden toplu yazar.
+    """
+    get_storage().execute(FEEDBACK_INSERT_SQL, feedback_params(user_input, suggested_plant, user_feedback))
+
+
+def add_feedback_batch(rows) -> None:
+    """
+    feedback_params() satırlarını tek transaction + executemany ile yazar.
+    """
+    get_storage().executemany(FEEDBACK_INSERT_SQL, rows)
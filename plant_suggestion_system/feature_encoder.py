@@ -0,0 +1,63 @@
+# feature_encoder.py – Compiled one‑hot encoder for serving
+# --------------------------------------------------------------
+# models/feedback_vec.pkl is the fitted ColumnTransformer/OneHotEncoder from
+# learning_engine.py. Calling it per request means DataFrame construction,
+# column selection and sklearn validation for a handful of lookups.
+# CompiledEncoder reads the fitted categories once and maps profile dicts
+# straight to output column indices (no pandas). Unknown categories encode
+# as an all‑zero block, exactly like handle_unknown="ignore".
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+class CompiledEncoder:
+    """Profile dict → one‑hot column indices / CSR rows."""
+
+    def __init__(self, columns: Sequence[str], categories: Sequence[Sequence], sparse_output: bool = True) -> None:
+        self.columns = list(columns)
+        self.sparse_output = sparse_output
+        self._index: List[Dict[object, int]] = []
+        offset = 0
+        for cats in categories:
+            self._index.append({cat: offset + i for i, cat in enumerate(cats)})
+            offset += len(cats)
+        self.n_features = offset
+
+    @classmethod
+    def from_transformer(cls, column_transformer) -> "CompiledEncoder":
+        """Compile a fitted ColumnTransformer holding a single OneHotEncoder."""
+        fitted = [t for t in column_transformer.transformers_ if t[0] != "remainder"]
+        remainder = [t for t in column_transformer.transformers_ if t[0] == "remainder"]
+        if len(fitted) != 1 or any(t[1] != "drop" for t in remainder):
+            raise ValueError("CompiledEncoder only supports a single one-hot transformer with remainder='drop'")
+
+        name, encoder, columns = fitted[0]
+        if getattr(encoder, "handle_unknown", "ignore") != "ignore" or getattr(encoder, "drop_idx_", None) is not None:
+            raise ValueError(f"Transformer '{name}' must use handle_unknown='ignore' and no dropped categories")
+
+        return cls(columns, [list(c) for c in encoder.categories_], bool(column_transformer.sparse_output_))
+
+    def indices(self, records: Sequence[dict]) -> np.ndarray:
+        """(n_records, n_columns) output column per input column, -1 = unknown."""
+        out = np.empty((len(records), len(self.columns)), dtype=np.int32)
+        for j, (col, index) in enumerate(zip(self.columns, self._index)):
+            out[:, j] = [index.get(rec.get(col), -1) for rec in records]
+        return out
+
+    def transform(self, records: Sequence[dict]):
+        """Encode like ColumnTransformer.transform – CSR or dense per the fitted output type."""
+        idx = self.indices(records)
+        known = idx >= 0
+        counts = known.sum(axis=1)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        matrix = sparse.csr_matrix(
+            (np.ones(int(indptr[-1])), idx[known], indptr),
+            shape=(len(records), self.n_features),
+        )
+        return matrix if self.sparse_output else matrix.toarray()
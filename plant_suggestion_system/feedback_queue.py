@@ -0,0 +1,276 @@
+# feedback_queue.py – Write‑behind sink for user feedback
+# --------------------------------------------------------------
+# A feedback click used to wait for connect + INSERT + COMMIT inside the
+# Streamlit handler. Now the handler only enqueues the row:
+#
+#   submit(row) ──► bounded in‑process queue ──► worker thread
+#                                                 │ batch of ≤ BATCH_SIZE rows or
+#                                                 │ FLUSH_INTERVAL s, whichever first
+#                                                 ▼
+#                              data_handling.add_feedback_batch (executemany, 1 txn)
+#                                                 │ DB down?
+#                                                 ▼
+#                              feedback_spill.jsonl (append + fsync), replayed
+#                              once the DB accepts writes again
+#
+# • The queue is bounded; when it is full the row goes straight to the spill
+#   file, so submit() never blocks on the database.
+# • flush() drains synchronously (False if a batch had to be spilled);
+#   close() (registered with atexit) flushes and stops the worker on shutdown.
+# • positive_count() = DB count + accepted rows still in memory, read
+#   consistently with the worker's commits – no flush needed for the
+#   retrain threshold.
+# • Delivery is at‑least‑once: a crash between a successful replay and the
+#   spill file removal can insert those rows twice.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUE = 10_000
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 2.0    # saniye – ilk satırdan sonra en geç bu kadar beklenir
+RETRY_INTERVAL = 30.0   # saniye – spill dosyası en fazla bu sıklıkla yeniden denenir
+SPILL_PATH = os.environ.get("PLANT_FEEDBACK_SPILL", "feedback_spill.jsonl")
+FEEDBACK_COL = -1       # feedback_params sırası: user_feedback en sonda
+
+_FLUSH = object()
+_STOP = object()
+
+Row = Sequence[object]
+
+
+def _positives(rows: Sequence[Row]) -> int:
+    return sum(1 for r in rows if r and r[FEEDBACK_COL] == 1)
+
+
+class FeedbackQueue:
+    """Bounded queue + background worker that writes rows in batches."""
+
+    def __init__(
+        self,
+        sink: Optional[Callable[[List[Row]], None]] = None,
+        spill_path: str | Path = SPILL_PATH,
+        max_queue: int = MAX_QUEUE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        retry_interval: float = RETRY_INTERVAL,
+    ) -> None:
+        if sink is None:
+            from data_handling import add_feedback_batch
+            sink = add_feedback_batch
+        self.sink = sink
+        self.spill_path = Path(spill_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self._queue: "queue.Queue[object]" = queue.Queue(max_queue)
+        self._spill_lock = threading.Lock()
+        self._commit_lock = threading.Lock()   # sink yazımı + pending düşümü tek adım
+        self._pending_lock = threading.Lock()
+        self._pending_positive = 0              # kuyrukta / yazılmakta olan kabul edilmiş satırlar
+        self._last_retry = 0.0
+        self._closed = False
+        self.written = self.spilled = 0
+        self._worker = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._worker.start()
+
+    # ----------------------------------------------------------
+    # Producer side
+    # ----------------------------------------------------------
+    def submit(self, row: Row) -> None:
+        """Enqueue one row; never blocks (overflow is spilled to disk)."""
+        if self._closed:
+            raise RuntimeError("FeedbackQueue is closed")
+        row = tuple(row)
+        positive = _positives([row])
+        with self._pending_lock:
+            self._pending_positive += positive
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._pending_lock:
+                self._pending_positive -= positive
+            logger.warning("Feedback queue full – spilling row to %s", self.spill_path)
+            self._spill([row])
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def positive_count(self, committed: Callable[[], int]) -> int:
+        """*committed()* (e.g. count_positive_feedback) + accepted rows not yet written.
+
+        Taken under the commit lock, so a batch is never counted both in the
+        DB and in memory; waits at most for one in‑flight batch, never flushes.
+        """
+        with self._commit_lock:
+            count = committed()
+            with self._pending_lock:
+                return count + self._pending_positive
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; False if *timeout* expired or a batch was spilled."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        spilled = self.spilled
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        done = self._queue.all_tasks_done
+        with done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                done.wait(remaining)
+        return self.spilled == spilled
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush, stop the worker; rows still unwritten end up in the spill file."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("Feedback queue still full after %.0fs – writer not stopped", timeout)
+            return
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.error("Feedback writer did not stop within %.0fs", timeout)
+
+    # ----------------------------------------------------------
+    # Worker side
+    # ----------------------------------------------------------
+    def _run(self) -> None:
+        batch: List[Row] = []
+        markers = 0          # batch'le birlikte task_done edilecek _FLUSH/_STOP sayısı
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else self.retry_interval
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            force = stop = False
+            while item is not None:
+                if item is _FLUSH:
+                    force = True
+                    markers += 1
+                elif item is _STOP:
+                    force = stop = True
+                    markers += 1
+                else:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if batch and (force or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+            if force:
+                self._replay_spill(force=True)
+            elif not batch:
+                self._replay_spill()
+            for _ in range(markers):
+                self._queue.task_done()
+            markers = 0
+            if stop:
+                return
+
+    def _write(self, rows: List[Row]) -> bool:
+        with self._commit_lock:
+            try:
+                self.sink(rows)
+                self.written += len(rows)
+                return True
+            except Exception as exc:
+                logger.error("❌ Feedback batch of %d failed (%s) – spilling to %s", len(rows), exc, self.spill_path)
+                self._spill(rows)  # spill'dekiler DB'ye yazılınca sayılır
+                self._last_retry = time.monotonic()
+                return False
+            finally:
+                with self._pending_lock:
+                    self._pending_positive -= _positives(rows)
+
+    def _spill(self, rows: List[Row]) -> None:
+        data = "".join(json.dumps(list(r), ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+        with self._spill_lock:
+            with open(self.spill_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.spilled += len(rows)
+
+    def _replay_spill(self, force: bool = False) -> None:
+        """Re‑send spilled rows; the file is removed only after they are written."""
+        now = time.monotonic()
+        if not force and now - self._last_retry < self.retry_interval:
+            return
+        self._last_retry = now
+        with self._spill_lock:
+            try:
+                raw = self.spill_path.read_bytes()
+            except FileNotFoundError:
+                return
+            rows = []
+            for line in raw.splitlines():
+                try:
+                    rows.append(tuple(json.loads(line)))
+                except ValueError:
+                    logger.warning("Skipping corrupt spilled feedback line")
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    self.sink(rows[i:i + self.batch_size])
+            except Exception as exc:
+                # Yazılan kısmı dosyadan çıkar, gerisi sonraki denemeye
+                logger.warning("Spilled feedback replay failed (%s) – will retry", exc)
+                rest = rows[i:]
+                tmp = self.spill_path.with_name(self.spill_path.name + ".tmp")
+                tmp.write_text("".join(json.dumps(list(r), ensure_ascii=False) + "\n" for r in rest), encoding="utf-8")
+                os.replace(tmp, self.spill_path)
+                return
+            self.spill_path.unlink()
+        self.written += len(rows)
+        logger.info("♻️ Replayed %d spilled feedback rows", len(rows))
+
+
+_feedback_queue: Optional[FeedbackQueue] = None
+_feedback_queue_lock = threading.Lock()
+
+
+def get_feedback_queue() -> FeedbackQueue:
+    """Process‑wide queue; flushed and stopped at interpreter exit."""
+    global _feedback_queue
+    if _feedback_queue is None:
+        with _feedback_queue_lock:
+            if _feedback_queue is None:
+                _feedback_queue = FeedbackQueue()
+                atexit.register(_feedback_queue.close)
+    return _feedback_queue
+
+
+def submit_feedback(user_input: dict, suggested_plant: str, user_feedback: int) -> None:
+    """Drop‑in, non‑blocking replacement for data_handling.add_feedback."""
+    from data_handling import feedback_params
+    get_feedback_queue().submit(feedback_params(user_input, suggested_plant, user_feedback))
@@ -0,0 +1,171 @@
+# kb_compiler.py – Compact binary form of knowledge_base.json
+# --------------------------------------------------------------
+# Parsing a large KB JSON (json.loads + one dict per rule) dominates the
+# engine's start‑up time and memory. The compiler interns every
+# (attribute, value) pair and plant name once and writes the rules as typed
+# columns (see rule_engine.RuleColumns):
+#
+#   MAGIC (8 B) │ header length (uint64 LE) │ JSON header │ pad │ arrays…
+#
+#   header  → source sha256, pair / plant vocab, meta_rules, frames and
+#             dtype / shape / offset of every array
+#   arrays  → positive.* / negative.* columns, each 64‑byte aligned
+#
+# load_compiled_kb() memory‑maps the arrays, so opening the file costs one
+# header parse regardless of the number of rules. The snapshot digest is the
+# source KB's content digest (snapshot + journal, see kb_journal.py), so
+# artifacts keyed on the KB (candidate_table.py) stay valid whichever format
+# the engine was started with.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from kb_journal import kb_digest, read_kb_source
+from rule_engine import KBSnapshot, KBVocab, RuleColumns
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PLANTKB\x01"
+COMPILED_SUFFIX = ".kbc"
+_ALIGN = 64
+_LEN = struct.Struct("<Q")
+
+
+def compiled_path_for(kb_path: str | Path) -> Path:
+    """knowledge_base.json → knowledge_base.kbc"""
+    return Path(kb_path).with_suffix(COMPILED_SUFFIX)
+
+
+def is_compiled_kb(path: str | Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# --------------------------------------------------------------
+# 🏗️ Compile
+# --------------------------------------------------------------
+def compile_kb(kb_path: str | Path = "knowledge_base.json", out_path: str | Path | None = None) -> Path:
+    """Compile a KB JSON file (plus its journal) into the binary format (atomic write)."""
+    kb, digest = read_kb_source(kb_path)
+    out_path = Path(out_path) if out_path else compiled_path_for(kb_path)
+
+    vocab = KBVocab()
+    columns = {
+        "positive": RuleColumns.from_dicts(kb.get("positive_rules", []), vocab),
+        "negative": RuleColumns.from_dicts(kb.get("negative_rules", []), vocab),
+    }
+
+    arrays: Dict[str, np.ndarray] = {
+        f"{side}.{field}": np.ascontiguousarray(getattr(cols, field))
+        for side, cols in columns.items()
+        for field in RuleColumns.FIELDS
+    }
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    header = json.dumps({
+        "digest": digest,
+        "pairs": vocab.pairs,
+        "plants": vocab.plants,
+        "meta_rules": kb.get("meta_rules", []),
+        "frames": kb.get("frames", {}),
+        "arrays": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(MAGIC) + _LEN.size + len(header)) // _ALIGN) * _ALIGN
+
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + _LEN.pack(len(header)) + header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, out_path)  # okuyucular hiçbir zaman yarım dosya görmez
+
+    logger.info(
+        "📦 KB compiled – %d positive, %d negative rules, %d pairs, %d plants → %s (%d bytes)",
+        len(columns["positive"]), len(columns["negative"]), len(vocab.pairs), len(vocab.plants),
+        out_path, data_start + offset,
+    )
+    return out_path
+
+
+# --------------------------------------------------------------
+# ⚡ Load
+# --------------------------------------------------------------
+def _read_header(path: str | Path) -> tuple[dict, int]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a compiled knowledge base")
+        (length,) = _LEN.unpack(f.read(_LEN.size))
+        blob = f.read(length)
+    if len(blob) != length:
+        raise ValueError(f"'{path}' has a truncated header")
+    data_start = -(-(len(MAGIC) + _LEN.size + length) // _ALIGN) * _ALIGN
+    return json.loads(blob.decode("utf-8")), data_start
+
+
+def read_compiled_header(path: str | Path) -> dict:
+    """Header only – cheap digest check before a full load."""
+    return _read_header(path)[0]
+
+
+def load_compiled_kb(path: str | Path) -> KBSnapshot:
+    """Open a compiled KB with its rule columns memory‑mapped read‑only."""
+    header, data_start = _read_header(path)
+    size = os.path.getsize(path)
+
+    def array(name: str) -> np.ndarray:
+        spec = header["arrays"][name]
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        offset = data_start + spec["offset"]
+        if offset + dtype.itemsize * int(np.prod(shape)) > size:
+            raise ValueError(f"'{path}' is truncated (array '{name}')")
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)  # boş dizi mmap edilemez
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+    vocab = KBVocab(header["pairs"], header["plants"])
+    positive, negative = (
+        RuleColumns(*(array(f"{side}.{field}") for field in RuleColumns.FIELDS))
+        for side in ("positive", "negative")
+    )
+    return KBSnapshot(vocab, positive, negative, header["meta_rules"], header["frames"], header["digest"])
+
+
+def is_current(compiled: str | Path, kb_path: str | Path) -> bool:
+    """True if *compiled* was built from the current contents of *kb_path*."""
+    try:
+        digest: Optional[str] = read_compiled_header(compiled)["digest"]
+    except (OSError, ValueError):
+        return False
+    return digest == kb_digest(kb_path)
+
+
+# --------------------------------------------------------------
+# 🖥️ CLI: python kb_compiler.py --kb knowledge_base.json [--out knowledge_base.kbc]
+# --------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Compile knowledge_base.json into the binary KB format")
+    parser.add_argument("--kb", default="knowledge_base.json", help="Path to KB JSON")
+    parser.add_argument("--out", help="Output path (default: <kb>.kbc)")
+    args = parser.parse_args()
+
+    compile_kb(args.kb, args.out)
@@ -0,0 +1,332 @@
+# kb_journal.py – Append‑only rule journal + compaction for knowledge_base.json
+# --------------------------------------------------------------
+# Rewriting the whole KB JSON on every retrain costs O(KB size) even when a
+# handful of rules change. Instead, changes are appended to a JSON‑lines
+# journal next to the snapshot:
+#
+#   knowledge_base.json            → snapshot (always replaced atomically)
+#   knowledge_base.journal.jsonl   → {"op": "add" | "upsert" | "remove",
+#                                     "section": "positive_rules" | "negative_rules",
+#                                     "rule": {...}}   one line per rule
+#
+# Readers fold the journal onto the snapshot. Every op is idempotent and
+# keyed by (conditions, plant), so replaying records that were already
+# folded is harmless – compaction can therefore write the new snapshot
+# first and trim the journal afterwards without any sequence numbers, and a
+# crash in between only means some records are replayed once more.
+# A truncated last line (crash mid‑append) is ignored by readers and cut
+# off by the next writer.
+#
+# Writers (append / compaction) serialise on an OS file lock on
+# knowledge_base.lock, so parallel retrains in different processes never
+# interleave a read‑modify‑write. Readers take no lock: they read snapshot +
+# journal and retry only if the snapshot was replaced meanwhile.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("positive_rules", "negative_rules")
+OPS = ("add", "upsert", "remove")
+
+# Journal bu boyutu ve snapshot'ın yarısını aşınca sıkıştırma önerilir
+COMPACT_MIN_BYTES = 64 * 1024
+
+_lock = threading.RLock()  # aynı süreçteki thread'leri sıralar (dosya kilidi süreç başına)
+_held = threading.local()
+
+
+def journal_path_for(kb_path: str | Path) -> Path:
+    """knowledge_base.json → knowledge_base.journal.jsonl"""
+    kb_path = Path(kb_path)
+    return kb_path.with_name(kb_path.stem + ".journal.jsonl")
+
+
+def lock_path_for(kb_path: str | Path) -> Path:
+    """knowledge_base.json → knowledge_base.lock"""
+    kb_path = Path(kb_path)
+    return kb_path.with_name(kb_path.stem + ".lock")
+
+
+# --------------------------------------------------------------
+# 🔒 Inter‑process writer lock
+# --------------------------------------------------------------
+@contextmanager
+def kb_write_lock(kb_path: str | Path) -> Iterator[None]:
+    """Exclusive writer lock (fcntl / msvcrt) – re‑entrant within a thread."""
+    with _lock:
+        depth = getattr(_held, "depth", 0)
+        if depth:
+            _held.depth = depth + 1
+            try:
+                yield
+            finally:
+                _held.depth = depth
+            return
+
+        with open(lock_path_for(kb_path), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK ~10 sn sonra vazgeçer, tekrar dene
+                        continue
+            _held.depth = 1
+            try:
+                yield
+            finally:
+                _held.depth = 0
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def rule_key(rule: dict) -> tuple:
+    """Identity of a rule: sorted conditions (lists → tuples) + suggested plant."""
+    cond = tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in rule.get("conditions", {}).items()
+    ))
+    return cond, rule.get("suggested_plant")
+
+
+# --------------------------------------------------------------
+# 💾 Atomic file helpers
+# --------------------------------------------------------------
+def atomic_write_bytes(path: str | Path, data: bytes) -> None:
+    """Write via tmp file + fsync + os.replace – readers see old or new, never half."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path: str | Path, obj: dict) -> None:
+    atomic_write_bytes(path, json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+# --------------------------------------------------------------
+# 📖 Read side
+# --------------------------------------------------------------
+def _valid_prefix(raw: bytes) -> bytes:
+    """Bytes up to the last complete line (drops a torn trailing record)."""
+    end = raw.rfind(b"\n") + 1
+    return raw[:end]
+
+
+def read_journal_bytes(kb_path: str | Path) -> bytes:
+    try:
+        return _valid_prefix(journal_path_for(kb_path).read_bytes())
+    except FileNotFoundError:
+        return b""
+
+
+def parse_journal(raw: bytes) -> List[dict]:
+    records = []
+    for lineno, line in enumerate(raw.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            logger.warning("Skipping corrupt journal line %d", lineno)
+            continue
+        if rec.get("op") in OPS and rec.get("section") in SECTIONS and isinstance(rec.get("rule"), dict):
+            records.append(rec)
+        else:
+            logger.warning("Skipping malformed journal record on line %d", lineno)
+    return records
+
+
+def apply_journal(kb: dict, records: Iterable[dict]) -> dict:
+    """Fold *records* into *kb* in place (order preserving, last writer wins)."""
+    index: Dict[str, Dict[tuple, int]] = {}
+    for section in SECTIONS:
+        rules = kb.setdefault(section, [])
+        index[section] = {rule_key(r): i for i, r in enumerate(rules)}
+
+    removed = False
+    for rec in records:
+        section, rule = rec["section"], rec["rule"]
+        rules, pos = kb[section], index[section]
+        key = rule_key(rule)
+        i = pos.get(key)
+        if rec["op"] == "remove":
+            if i is not None:
+                rules[i] = None  # sonda toplu temizlenir
+                del pos[key]
+                removed = True
+        elif i is None:
+            pos[key] = len(rules)
+            rules.append(rule)
+        elif rec["op"] == "upsert":
+            rules[i] = rule
+
+    if removed:
+        for section in SECTIONS:
+            kb[section] = [r for r in kb[section] if r is not None]
+    return kb
+
+
+def source_digest(snapshot_raw: bytes, journal_raw: bytes) -> str:
+    """KB content id; equals the plain snapshot sha256 while the journal is empty."""
+    h = hashlib.sha256(snapshot_raw)
+    if journal_raw:
+        h.update(b"\0journal\0")
+        h.update(journal_raw)
+    return h.hexdigest()
+
+
+def read_kb_bytes(kb_path: str | Path, retries: int = 20) -> Tuple[bytes, bytes]:
+    """Consistent (snapshot, journal) bytes without taking the writer lock.
+
+    Compaction replaces the snapshot *before* trimming the journal, so a read
+    is consistent as long as the snapshot file we read is still the one on
+    disk after the journal was read; otherwise start over.
+    """
+    for _ in range(retries):
+        with open(kb_path, "rb") as f:
+            snapshot_raw = f.read()
+            journal_raw = read_journal_bytes(kb_path)
+            before = os.fstat(f.fileno())
+        try:
+            after = os.stat(kb_path)
+        except FileNotFoundError:
+            continue
+        if (before.st_ino, before.st_mtime_ns, before.st_size) == (after.st_ino, after.st_mtime_ns, after.st_size):
+            return snapshot_raw, journal_raw
+    raise OSError(f"'{kb_path}' kept changing while being read")
+
+
+def read_kb_source(kb_path: str | Path) -> Tuple[dict, str]:
+    """(snapshot + journal tail folded into one KB dict, content digest)."""
+    snapshot_raw, journal_raw = read_kb_bytes(kb_path)
+    kb = json.loads(snapshot_raw.decode("utf-8"))
+    if journal_raw:
+        apply_journal(kb, parse_journal(journal_raw))
+    return kb, source_digest(snapshot_raw, journal_raw)
+
+
+def kb_digest(kb_path: str | Path) -> str:
+    return source_digest(*read_kb_bytes(kb_path))
+
+
+# --------------------------------------------------------------
+# ✍️ Write side
+# --------------------------------------------------------------
+def append_records(kb_path: str | Path, records: Iterable[dict]) -> int:
+    """Append journal records (one fsync for the batch); returns how many."""
+    lines = []
+    for rec in records:
+        if rec.get("op") not in OPS or rec.get("section") not in SECTIONS:
+            raise ValueError(f"Invalid journal record: {rec!r}")
+        lines.append(json.dumps(rec, ensure_ascii=False))
+    if not lines:
+        return 0
+
+    path = journal_path_for(kb_path)
+    with kb_write_lock(kb_path):
+        with open(path, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(max(0, size - 1))
+                if f.read(1) != b"\n":  # yarım kalmış son satırı kes
+                    f.seek(0)
+                    f.truncate(len(_valid_prefix(f.read())))
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+    return len(lines)
+
+
+def needs_compaction(kb_path: str | Path) -> bool:
+    try:
+        journal = journal_path_for(kb_path).stat().st_size
+    except FileNotFoundError:
+        return False
+    return journal >= max(COMPACT_MIN_BYTES, Path(kb_path).stat().st_size // 2)
+
+
+def compact(kb_path: str | Path, prune: bool = False) -> Optional[Dict[str, int]]:
+    """Fold the journal into a new snapshot (atomic), then trim the folded records.
+
+    Returns rule counts, or None if there was nothing to fold.
+    """
+    kb_path = Path(kb_path)
+    path = journal_path_for(kb_path)
+    with kb_write_lock(kb_path):
+        journal_raw = read_journal_bytes(kb_path)
+        if not journal_raw and not prune:
+            return None
+
+        kb = json.loads(kb_path.read_bytes().decode("utf-8"))
+        apply_journal(kb, parse_journal(journal_raw))
+        if prune:
+            from kb_updater import prune_kb
+            prune_kb(kb)
+        atomic_write_json(kb_path, kb)
+
+        # Sadece katlanan kısmı at; bu arada eklenen kayıtlar korunur
+        if journal_raw:
+            current = path.read_bytes()
+            tail = current[len(journal_raw):] if current.startswith(journal_raw) else current
+            atomic_write_bytes(path, tail)
+
+    counts = {s: len(kb[s]) for s in SECTIONS}
+    logger.info(
+        "🗜️ KB compacted – %d journal bytes folded → %d positive, %d negative rules",
+        len(journal_raw), counts["positive_rules"], counts["negative_rules"],
+    )
+    return counts
+
+
+def compact_in_background(kb_path: str | Path, prune: bool = False) -> threading.Thread:
+    """Run :func:`compact` on a worker thread (non‑daemon so a CLI waits for it)."""
+    def run() -> None:
+        try:
+            compact(kb_path, prune=prune)
+        except Exception as exc:  # eski snapshot + journal geçerli kalır
+            logger.error("KB compaction failed: %s", exc)
+
+    worker = threading.Thread(target=run, name="kb-compact")
+    worker.start()
+    return worker
+
+
+# --------------------------------------------------------------
+# 🖥️ CLI: python kb_journal.py --kb knowledge_base.json [--prune]
+# --------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Fold the KB journal into knowledge_base.json")
+    parser.add_argument("--kb", default="knowledge_base.json", help="Path to KB JSON snapshot")
+    parser.add_argument("--prune", action="store_true", help="Also drop dominated rules")
+    args = parser.parse_args()
+
+    compact(args.kb, prune=args.prune)
@@ -0,0 +1,156 @@
+# kb_stress.py – Concurrency stress check for the KB writers / readers
+# --------------------------------------------------------------
+# Spawns several updater *processes* that merge disjoint batches of rules
+# into one scratch KB (journal appends + frequent compactions, all under the
+# kb_journal writer lock) while reader processes keep loading the KB the way
+# the app does (load_snapshot / read_kb_source, no lock).
+#
+# Checks at the end:
+#   • no rule any updater wrote is missing from the final KB
+#   • no read ever failed and a reader never saw the rule count go down
+#
+#   python kb_stress.py [--writers 8] [--readers 4] [--batches 20] [--batch-size 25]
+# Exit status is non‑zero on any violation.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+_HERE = Path(__file__).resolve().parent
+
+
+def _rule(writer: int, batch: int, i: int) -> dict:
+    """Raw parsed‑rule shape (as learning_engine_v2 emits it), unique per (writer, batch, i)."""
+    return {
+        "conditions": {"sunlight": [f"need w{writer}b{batch}"], "area": [f"size r{i}"]},
+        "suggested_plant": f"Plant_{writer}_{batch}_{i}",
+        "feedback": 1 if i % 4 else 0,
+    }
+
+
+def _writer(kb_path: str, writer: int, batches: int, batch_size: int, workdir: str) -> None:
+    sys.path.insert(0, str(_HERE))
+    import kb_journal
+    from kb_updater import update_knowledge_base
+
+    kb_journal.COMPACT_MIN_BYTES = 4 * 1024  # sık sıkıştırma → daha çok çakışma
+    parsed = Path(workdir) / f"parsed_{writer}.json"
+    for b in range(batches):
+        parsed.write_text(json.dumps([_rule(writer, b, i) for i in range(batch_size)]), encoding="utf-8")
+        update_knowledge_base(parsed, kb_path, prune=False, compact_async=(b % 2 == 0))
+
+
+def _reader(kb_path: str, stop, errors, reads) -> None:
+    sys.path.insert(0, str(_HERE))
+    from kb_journal import read_kb_source
+    from rule_engine import load_snapshot
+
+    last = 0
+    n = 0
+    while not stop.is_set():
+        try:
+            if n % 2:
+                kb, _ = read_kb_source(kb_path)
+                count = len(kb["positive_rules"]) + len(kb["negative_rules"])
+            else:
+                snap = load_snapshot(kb_path)
+                count = len(snap.positive_rules) + len(snap.negative_rules)
+        except Exception as exc:
+            errors.put(f"read failed: {exc!r}")
+            continue
+        if count < last:
+            errors.put(f"rule count went down: {last} → {count}")
+        last = count
+        n += 1
+    reads.put(n)
+
+
+def run_stress(writers: int = 8, readers: int = 4, batches: int = 20, batch_size: int = 25) -> Dict[str, object]:
+    """Run the stress scenario on a scratch copy of knowledge_base.json; return a report."""
+    sys.path.insert(0, str(_HERE))
+    from kb_journal import compact, read_kb_source, rule_key
+    from kb_updater import _normalise_conditions
+
+    workdir = tempfile.mkdtemp(prefix="kb_stress_")
+    try:
+        kb_path = Path(workdir) / "knowledge_base.json"
+        shutil.copyfile(_HERE / "knowledge_base.json", kb_path)
+        base, _ = read_kb_source(kb_path)
+
+        ctx = mp.get_context("spawn")
+        stop, errors, reads = ctx.Event(), ctx.Queue(), ctx.Queue()
+        reader_procs = [ctx.Process(target=_reader, args=(str(kb_path), stop, errors, reads)) for _ in range(readers)]
+        writer_procs = [
+            ctx.Process(target=_writer, args=(str(kb_path), w, batches, batch_size, workdir)) for w in range(writers)
+        ]
+
+        t0 = time.perf_counter()
+        for p in reader_procs + writer_procs:
+            p.start()
+        for p in writer_procs:
+            p.join()
+        stop.set()
+        for p in reader_procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+
+        problems: List[str] = []
+        while not errors.empty():
+            problems.append(errors.get())
+        problems += [f"writer exited with {p.exitcode}" for p in writer_procs if p.exitcode]
+        total_reads = sum(reads.get() for _ in reader_procs)
+
+        compact(kb_path)
+        final, _ = read_kb_source(kb_path)
+        present = {(s, rule_key(r)) for s in ("positive_rules", "negative_rules") for r in final[s]}
+        expected = {(s, rule_key(r)) for s in ("positive_rules", "negative_rules") for r in base[s]}
+        for w in range(writers):
+            for b in range(batches):
+                for i in range(batch_size):
+                    raw = _rule(w, b, i)
+                    section = "positive_rules" if raw["feedback"] == 1 else "negative_rules"
+                    rule = {"conditions": _normalise_conditions(raw["conditions"]),
+                            "suggested_plant": raw["suggested_plant"]}
+                    expected.add((section, rule_key(rule)))
+        lost = expected - present
+        if lost:
+            problems.append(f"{len(lost)} rules lost, e.g. {next(iter(lost))}")
+
+        return {
+            "writers": writers,
+            "readers": readers,
+            "rules_written": writers * batches * batch_size,
+            "rules_final": len(present),
+            "reads": total_reads,
+            "seconds": round(elapsed, 2),
+            "problems": problems,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Stress parallel KB updaters and readers")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batches", type=int, default=20, help="Update rounds per writer")
+    parser.add_argument("--batch-size", type=int, default=25, help="Rules per update round")
+    args = parser.parse_args()
+
+    report = run_stress(args.writers, args.readers, args.batches, args.batch_size)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if report["problems"] else 0)
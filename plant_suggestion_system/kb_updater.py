@@ -3,6 +3,11 @@
 # • Reads freshly parsed rules (JSON) that include a `feedback` flag
 # • Normalises condition keys/values so they match UI / RuleEngine schema
 # • Merges the rules into knowledge_base.json → positive_rules / negative_rules
+#   (appended to knowledge_base.journal.jsonl, folded by compaction)
+# • Keeps support / confidence / lift; a re‑mined rule replaces the stats
+#   (full‑table mining) or pools counts (disjoint batch), unchanged rules are
+#   not rewritten
+# • Prunes rules dominated by a more general rule for the same plant
 # • Designed so that `pytest` tests (e.g. test_update_kb_rules_split) pass by
 #   exposing *update_knowledge_base(parsed_path, kb_path)*
 # --------------------------------------------------------------
@@ -11,8 +16,23 @@ from __future__ import annotations
 
 import json
 import logging
+import math
+from itertools import combinations
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from kb_journal import (
+    append_records,
+    atomic_write_json,
+    compact,
+    compact_in_background,
+    journal_path_for,
+    kb_write_lock,
+    needs_compaction,
+    read_kb_source,
+    rule_key,
+)
+from rule_engine import PROFILE_SPACE
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -84,99 +104,320 @@ def _normalise_conditions(raw: Dict[str, List[str] | str]) -> Dict[str, str]:
     return norm
 
 
+# --------------------------------------------------------------
+# 📊 Rule statistics
+# --------------------------------------------------------------
+# The miner reports support, confidence and lift per rule plus the number of
+# transactions it mined (n_transactions). Those three ratios are enough to
+# recover the underlying counts:
+#
+#   rule count        = support · n
+#   antecedent count  = support · n / confidence
+#   consequent count  = confidence / lift · n
+#
+# How a re‑mined rule is merged depends on what the miner read:
+#
+#   no batch_id  → the whole data set (learning_engine_v2 --csv); the new
+#                  stats already cover every earlier row → *replace*
+#   batch_id     → a disjoint Feedback id range, e.g. "7001-9000" (the DB
+#                  miner's next batch); counts are added and the ratios
+#                  recomputed – the same result as mining both batches
+#                  together. Ids already pooled are listed in "batch_ids", so
+#                  replaying a batch never counts it twice; a rule whose
+#                  stats came from a full mine is replaced, not pooled.
+#                  mined_through() – the highest pooled id – is where the
+#                  miner's next batch starts.
+#
+# Each stored rule also keeps the stats of the last mining result in
+# "last_batch"; a rule whose incoming stats equal it is skipped.
+STAT_FIELDS = ("support", "confidence", "lift")
+
+
+def _rule_stats(raw: dict) -> Dict[str, object]:
+    stats: Dict[str, object] = {k: float(raw[k]) for k in STAT_FIELDS if raw.get(k) is not None}
+    if len(stats) == len(STAT_FIELDS) and raw.get("n_transactions"):
+        stats["n_transactions"] = int(raw["n_transactions"])
+        if raw.get("batch_id") is not None:
+            stats["batch_id"] = str(raw["batch_id"])
+    return stats
+
+
+def _batch_of(rule: dict) -> Dict[str, object]:
+    """Stats of a single mining result (what "last_batch" stores)."""
+    return {k: rule[k] for k in (*STAT_FIELDS, "n_transactions", "batch_id") if k in rule}
+
+
+def _same_stats(a: dict, b: dict) -> bool:
+    return all(
+        k in a and k in b and math.isclose(a[k], b[k], rel_tol=1e-9)
+        for k in STAT_FIELDS
+    ) and a.get("n_transactions") == b.get("n_transactions") and a.get("batch_id") == b.get("batch_id")
+
+
+def stored_rule(rule: dict) -> dict:
+    """KB form of a freshly mined rule (stats + last_batch bookkeeping)."""
+    if not all(k in rule for k in STAT_FIELDS):
+        return rule
+    stored = {k: v for k, v in rule.items() if k != "batch_id"}
+    stored["last_batch"] = _batch_of(rule)
+    if "batch_id" in rule:
+        stored["batch_ids"] = [rule["batch_id"]]
+    return stored
+
+
+def merge_rule_stats(old: dict, new: dict) -> Optional[dict]:
+    """Merged rule for a re‑mined *new* over the stored *old*; None if nothing changed."""
+    if not all(k in new for k in STAT_FIELDS):
+        return None
+    last = old.get("last_batch", _batch_of(old))
+    if _same_stats(last, new):
+        return None  # aynı madencilik sonucu tekrar geldi
+
+    batch_id = new.get("batch_id")
+    if batch_id is not None and batch_id in old.get("batch_ids", []):
+        return None  # bu parti zaten toplama katıldı
+
+    pooled = (
+        batch_id is not None
+        and old.get("batch_ids")
+        and all(k in old for k in STAT_FIELDS)
+        and old.get("n_transactions") and new.get("n_transactions")
+        and all(r["confidence"] > 0 and r["lift"] > 0 for r in (old, new))
+    )
+    if not pooled:
+        return stored_rule(new)  # tüm tablo yeniden madenlendi → değiştir
+
+    n = old["n_transactions"] + new["n_transactions"]
+    rule_n = sum(r["support"] * r["n_transactions"] for r in (old, new))
+    ante_n = sum(r["support"] * r["n_transactions"] / r["confidence"] for r in (old, new))
+    cons_n = sum(r["confidence"] / r["lift"] * r["n_transactions"] for r in (old, new))
+    confidence = rule_n / ante_n
+    merged = stored_rule(new)
+    merged.update({
+        "support": rule_n / n,
+        "confidence": confidence,
+        "lift": confidence / (cons_n / n),
+        "n_transactions": n,
+        "batch_ids": [*old.get("batch_ids", []), batch_id],
+    })
+    return merged
+
+
+def mined_through(kb: dict) -> int:
+    """Highest Feedback id already pooled into *kb* (0 if none)."""
+    last = 0
+    for section in ("positive_rules", "negative_rules"):
+        for rule in kb.get(section, []):
+            for batch_id in rule.get("batch_ids", []):
+                end = str(batch_id).rpartition("-")[2]
+                if end.isdigit():
+                    last = max(last, int(end))
+    return last
+
+
+# --------------------------------------------------------------
+# ✂️ Redundant‑rule pruning
+# --------------------------------------------------------------
+# A rule R is *dominated* by a rule G when G suggests the same plant,
+# G's conditions are a proper subset of R's, G's confidence and lift are
+# both ≥ R's, and G is ranked ahead of R by the engine (confidence, lift,
+# then KB order). Every profile that matches R then also matches G, which
+# already puts the plant at the same or a better position, so dropping R
+# never changes a candidate list. Rules that constrain every form field are
+# kept: RuleEngine returns them on their own via the exact‑match step.
+
+def prune_redundant_rules(rules: List[dict]) -> List[dict]:
+    """Return *rules* (same order) without the dominated ones."""
+    full_profile = set(PROFILE_SPACE)
+    best: Dict[tuple, tuple] = {}  # (conditions, plant) → en iyi (sıra anahtarı, conf, lift)
+    keyed = []
+    for pos, r in enumerate(rules):
+        conf, lift = r.get("confidence", 1.0), r.get("lift", 1.0)
+        entry = ((-conf, -lift, pos), conf, lift)
+        key = rule_key(r)
+        keyed.append((key, entry))
+        if key not in best or entry[0] < best[key][0]:
+            best[key] = entry
+
+    kept = []
+    for r, ((cond, plant), (rank, conf, lift)) in zip(rules, keyed):
+        dominated = False
+        if not full_profile <= set(r.get("conditions", {})):
+            for size in range(len(cond)):
+                for subset in combinations(cond, size):
+                    general = best.get((subset, plant))
+                    if general and general[0] < rank and general[1] >= conf and general[2] >= lift:
+                        dominated = True
+                        break
+                if dominated:
+                    break
+        if not dominated:
+            kept.append(r)
+    return kept
+
+
+def prune_kb(kb: dict) -> Dict[str, int]:
+    """Prune positive/negative rule lists of *kb* in place; return removed counts."""
+    removed = {}
+    for section in ("positive_rules", "negative_rules"):
+        rules = kb.get(section, [])
+        kept = prune_redundant_rules(rules)
+        removed[section] = len(rules) - len(kept)
+        kb[section] = kept
+    return removed
+
+
 # --------------------------------------------------------------
 # 🎯 Public API – used by tests & CLI
 # --------------------------------------------------------------
 
-def update_knowledge_base(parsed_path: str | Path, kb_path: str | Path) -> None:
+def update_knowledge_base(parsed_path: str | Path, kb_path: str | Path, prune: bool = True,
+                          compact_async: bool = True) -> None:
     """
-    Merge parsed rules into knowledge_base.json after normalising keys/values.
+    Merge parsed rules into the knowledge base after normalising keys/values.
+
+    New rules are appended to the KB journal (kb_journal.py) instead of
+    rewriting knowledge_base.json; once the journal is large enough it is
+    folded into a new snapshot by a background compaction. Rules already in
+    the KB get their statistics merged (see merge_rule_stats) via an
+    "upsert" record, or are skipped when the statistics did not change.
 
     Parameters
     ----------
     parsed_path : str | Path
         Path to JSON file produced by rule parser / learning engine. Expected format:
-        [{"conditions": {...}, "suggested_plant": "...", "feedback": 1}, ...]
+        [{"conditions": {...}, "suggested_plant": "...", "feedback": 1,
+          "support": ..., "confidence": ..., "lift": ..., "n_transactions": ...,
+          "batch_id": ...}, ...]
+        (statistics optional; batch_id only when the miner read a disjoint batch)
     kb_path : str | Path
-        Existing knowledge_base.json. Will be overwritten in-place after merge.
+        Existing knowledge_base.json (snapshot). Only replaced atomically by compaction.
+    prune : bool
+        Drop dominated rules (see prune_redundant_rules) when compacting.
+    compact_async : bool
+        Compact on a background thread (False → compact before returning).
     """
     parsed_path = Path(parsed_path)
     kb_path = Path(kb_path)
 
-    # --- JSON dosyalarını oku ------------------------------------------------
+    # --- JSON dosyasını oku ----------------------------------------------------
     with parsed_path.open("r", encoding="utf-8") as f:
         parsed_rules = json.load(f)
 
-    with kb_path.open("r", encoding="utf-8") as f:
-        kb = json.load(f)
-
-    # --- Hedef listelerin varlığını garanti et ------------------------------
-    kb.setdefault("positive_rules", [])
-    kb.setdefault("negative_rules", [])
-
-    # --- Hash yardımı: koşullardaki list → tuple, böylece hashlenebilir -------
-    def rule_hash(r: dict) -> tuple:
-        cond = tuple(
-    sorted(
-        (k, tuple(v) if isinstance(v, list) else v)   # ← list → tuple
-        for k, v in r["conditions"].items()
-    )
-)
-        
-
-        return (cond, r["suggested_plant"])
-
-    existing_pos = {rule_hash(r) for r in kb["positive_rules"]}
-    existing_neg = {rule_hash(r) for r in kb["negative_rules"]}
-
-    added_pos = added_neg = 0
-
-    # --- Yeni kuralları ekle -------------------------------------------------
-    for raw in parsed_rules:
-        plant = raw.get("suggested_plant")
-        feedback = int(raw.get("feedback", 1))       # default = positive
-        norm_conditions = _normalise_conditions(raw.get("conditions", {}))
-
-        rule_dict = {
-            "conditions": norm_conditions,
-            "suggested_plant": plant,
-            "feedback": feedback,
+    # --- Journal kayıtlarını hazırla (okuma + yazma aynı kilit altında) -------
+    records = []
+    seen = set()
+    added_pos = added_neg = merged = unchanged = 0
+    with kb_write_lock(kb_path):
+        current, _ = read_kb_source(kb_path)
+        existing = {
+            (section, rule_key(r)): r
+            for section in ("positive_rules", "negative_rules")
+            for r in current.get(section, [])
         }
-        rule_id = rule_hash(rule_dict)
 
-        if feedback == 1:                            # --- pozitif kural
-            if rule_id not in existing_pos:
-                kb["positive_rules"].append(rule_dict)
-                existing_pos.add(rule_id)
+        for raw in parsed_rules:
+            plant = raw.get("suggested_plant")
+            feedback = int(raw.get("feedback", 1))       # default = positive
+            norm_conditions = _normalise_conditions(raw.get("conditions", {}))
+
+            rule_dict = {
+                "conditions": norm_conditions,
+                "suggested_plant": plant,
+                "feedback": feedback,
+                **_rule_stats(raw),
+            }
+            section = "positive_rules" if feedback == 1 else "negative_rules"
+            rule_id = (section, rule_key(rule_dict))
+            if rule_id in seen:                          # aynı dosyada tekrar eden kural
+                continue
+            seen.add(rule_id)
+
+            old = existing.get(rule_id)
+            if old is not None:
+                update = merge_rule_stats(old, rule_dict)
+                if update is None:                       # istatistik değişmemiş → yazma
+                    unchanged += 1
+                else:
+                    records.append({"op": "upsert", "section": section, "rule": update})
+                    merged += 1
+                continue
+
+            records.append({"op": "add", "section": section, "rule": stored_rule(rule_dict)})
+            if feedback == 1:
                 added_pos += 1
-        else:                                        # --- negatif kural
-            if rule_id not in existing_neg:
-                kb["negative_rules"].append(rule_dict)
-                existing_neg.add(rule_id)
+            else:
                 added_neg += 1
 
-    # --- Dosyaya yaz ---------------------------------------------------------
-    with kb_path.open("w", encoding="utf-8") as f:
-        json.dump(kb, f, indent=2, ensure_ascii=False)
+        # --- Journal'a ekle (tek fsync) ------------------------------------------
+        append_records(kb_path, records)
+    logger.info(
+        "KB journal → +%d positive, +%d negative, %d merged, %d unchanged",
+        added_pos, added_neg, merged, unchanged,
+    )
+
+    # --- Gerekirse snapshot'a katla ----------------------------------------------
+    if needs_compaction(kb_path):
+        if compact_async:
+            compact_in_background(kb_path, prune=prune)
+        else:
+            compact(kb_path, prune=prune)
+
 
+def prune_knowledge_base(kb_path: str | Path, out_path: str | Path | None = None) -> Dict[str, int]:
+    """Standalone pruning pass over a KB (snapshot + journal); returns a shrink report."""
+    kb_path = Path(kb_path)
+    journal = journal_path_for(kb_path)
+    kb, _ = read_kb_source(kb_path)
+    before = {s: len(kb.get(s, [])) for s in ("positive_rules", "negative_rules")}
+    bytes_before = kb_path.stat().st_size + (journal.stat().st_size if journal.exists() else 0)
+
+    if out_path is None or Path(out_path) == kb_path:
+        out_path = kb_path
+        after = compact(kb_path, prune=True)     # journal'ı katla + buda, atomik yaz
+    else:
+        out_path = Path(out_path)
+        prune_kb(kb)
+        atomic_write_json(out_path, kb)
+        after = {s: len(kb[s]) for s in ("positive_rules", "negative_rules")}
+    removed = {s: before[s] - after[s] for s in before}
+
+    report = {
+        "positive_before": before["positive_rules"],
+        "positive_removed": removed["positive_rules"],
+        "negative_before": before["negative_rules"],
+        "negative_removed": removed["negative_rules"],
+        "bytes_before": bytes_before,
+        "bytes_after": out_path.stat().st_size,
+    }
+    total_before = before["positive_rules"] + before["negative_rules"]
+    total_removed = removed["positive_rules"] + removed["negative_rules"]
     logger.info(
-        "KB updated → +%d positive, +%d negative (total: %d pos, %d neg)",
-        added_pos,
-        added_neg,
-        len(kb['positive_rules']),
-        len(kb['negative_rules']),
+        "KB pruned → %d/%d rules removed (%.1f%%), %d → %d bytes",
+        total_removed, total_before, 100.0 * total_removed / max(total_before, 1),
+        report["bytes_before"], report["bytes_after"],
     )
+    return report
 
 
 # --------------------------------------------------------------
 # 🖥️ Optional CLI usage: python kb_updater.py --parsed parsed_rules.json --kb knowledge_base.json
+#                        python kb_updater.py --prune-only --kb knowledge_base.json [--out pruned.json]
 # --------------------------------------------------------------
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Merge parsed rules into knowledge_base.json")
-    parser.add_argument("--parsed", required=True, help="Path to parsed_rules.json")
+    parser.add_argument("--parsed", help="Path to parsed_rules.json")
     parser.add_argument("--kb", required=True, help="Path to knowledge_base.json to update")
+    parser.add_argument("--prune-only", action="store_true", help="Only prune dominated rules, no merge")
+    parser.add_argument("--no-prune", action="store_true", help="Merge without pruning")
+    parser.add_argument("--out", help="With --prune-only: write the pruned KB here instead of in place")
     args = parser.parse_args()
 
-    update_knowledge_base(args.parsed, args.kb)
+    if args.prune_only:
+        prune_knowledge_base(args.kb, args.out)
+    elif args.parsed:
+        update_knowledge_base(args.parsed, args.kb, prune=not args.no_prune)
+    else:
+        parser.error("--parsed is required unless --prune-only is given")
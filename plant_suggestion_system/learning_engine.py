@@ -3,7 +3,6 @@ import os
 import logging
 import joblib
 import pandas as pd
-import pyodbc
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 import json
@@ -11,6 +10,11 @@ import json
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
+import numpy as np
+
+from score_table import SCORE_TABLE_PATH, ScoreTable, file_digest
+from storage import get_storage
+from tree_ensemble import TREES_PATH, TreeEnsemble
 
 # --------------------------------------------------------------
 # Config & Logging
@@ -21,16 +25,7 @@ logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 # --------------------------------------------------------------
 # Database Connection
 # --------------------------------------------------------------
-def sql_connect():
-    """
-    Establish connection to the SQL Server database.
-    """
-    return pyodbc.connect(
-        r"DRIVER={ODBC Driver 17 for SQL Server};"
-        r"SERVER=LAPTOP-7GK6MUOG\SQLEXPRESS;"
-        r"DATABASE=Smart_Plant_Recomandation_System;"
-        r"Trusted_Connection=yes;"
-    )
+# Bağlantı storage.py'deki ortak havuzdan (PLANT_DB_BACKEND=odbc|sqlite).
 
 # --------------------------------------------------------------
 # Data Loading
@@ -40,7 +35,6 @@ def fetch_feedback_data():
     """
     Fetch all feedback records with user inputs and chosen plant.
     """
-    conn = sql_connect()
     query = '''
     SELECT
         area_size,
@@ -56,8 +50,7 @@ def fetch_feedback_data():
         user_feedback
     FROM Feedback
     '''
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = get_storage().read_sql(query)
     logging.info(f"Fetched {len(df)} feedback records.")
     return df
 
@@ -84,6 +77,111 @@ def save_confusion_matrix(y_true, y_pred, filename="confusion_matrix.png"):
     plt.savefig(filename)
     logging.info(f"📊 Confusion matrix saved to {filename}")
 
+def save_score_table(model, column_transformer, X_raw_check, X_encoded_check,
+                     path: str = SCORE_TABLE_PATH) -> bool:
+    """
+    Enumerate every fitted category combination, score it in one batch and
+    save the dense table – only if lookups reproduce predict_proba exactly.
+    """
+    table = ScoreTable.build(model, column_transformer, file_digest("models/feedback_model.pkl"))
+
+    expected = model.predict_proba(X_encoded_check)[:, 1]
+    looked_up = table.score(X_raw_check.to_dict(orient="records"))
+    if not np.array_equal(expected, looked_up):
+        mismatches = int(np.sum(expected != looked_up))
+        logging.error("❌ Score table disagrees with the model on %d/%d rows – not saved.",
+                      mismatches, len(expected))
+        if os.path.exists(path):
+            os.remove(path)  # eski tablo yeni modelle uyumsuz
+        return False
+
+    table.save(path)
+    logging.info("🧮 Score table verified on %d held-out rows (%d cells)", len(expected), table.scores.size)
+    return True
+
+def export_tree_ensemble(model, n_features: int) -> TreeEnsemble:
+    """
+    Flatten the trained booster's trees into NumPy node arrays.
+    """
+    booster = model.get_booster()
+    names = booster.feature_names or []
+    name_to_idx = {n: i for i, n in enumerate(names)}
+
+    def _feature_index(split: str) -> int:
+        if split in name_to_idx:
+            return name_to_idx[split]
+        return int(split.lstrip("f"))  # isimsiz eğitim → "f12"
+
+    feature, threshold, yes, no, missing, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    for dump in booster.get_dump(dump_format="json"):
+        tree = json.loads(dump)
+        offset = len(value)
+        roots.append(offset)
+
+        # nodeid → satır; önce tüm düğümleri topla
+        stack, nodes = [(tree, 0)], {}
+        while stack:
+            node, depth = stack.pop()
+            nodes[node["nodeid"]] = node
+            max_depth = max(max_depth, depth)
+            stack.extend((child, depth + 1) for child in node.get("children", []))
+
+        size = max(nodes) + 1
+        for lst, default in ((feature, 0), (threshold, 0.0), (value, 0.0)):
+            lst.extend([default] * size)
+        for lst in (yes, no, missing):
+            lst.extend(range(offset, offset + size))  # yaprak / boş → kendine döner
+
+        for nid, node in nodes.items():
+            i = offset + nid
+            if "leaf" in node:
+                value[i] = node["leaf"]
+                continue
+            feature[i] = _feature_index(node["split"])
+            threshold[i] = node["split_condition"]
+            yes[i], no[i], missing[i] = offset + node["yes"], offset + node["no"], offset + node["missing"]
+
+    # binary:logistic → base_score olasılık uzayında saklanır
+    config = json.loads(booster.save_config())
+    base_score = float(str(config["learner"]["learner_model_param"]["base_score"]).strip("[]"))
+    base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+    return TreeEnsemble(
+        feature=np.asarray(feature, dtype=np.int32),
+        threshold=np.asarray(threshold, dtype=np.float32),
+        yes=np.asarray(yes, dtype=np.int32),
+        no=np.asarray(no, dtype=np.int32),
+        missing=np.asarray(missing, dtype=np.int32),
+        value=np.asarray(value, dtype=np.float32),
+        roots=np.asarray(roots, dtype=np.int32),
+        base_margin=base_margin,
+        max_depth=max_depth,
+        n_features=n_features,
+        model_sha256=file_digest("models/feedback_model.pkl"),
+    )
+
+
+def save_tree_ensemble(model, X_check, path: str = TREES_PATH) -> bool:
+    """
+    Export the booster for NumPy serving – only if it agrees with predict_proba
+    on the held-out split.
+    """
+    ensemble = export_tree_ensemble(model, X_check.shape[1])
+
+    expected = model.predict_proba(X_check)
+    actual = ensemble.predict_proba(X_check)
+    max_err = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if not np.allclose(expected, actual, rtol=0.0, atol=1e-6):
+        logging.error("❌ Tree export parity failed (max |Δp| = %.2e) – not saved.", max_err)
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+
+    ensemble.save(path)
+    logging.info("🌲 Tree export parity OK on %d held-out rows (max |Δp| = %.2e)", len(expected), max_err)
+    return True
+
 def main():
    
 
@@ -110,8 +208,8 @@ def main():
     X_encoded = column_transformer.fit_transform(X_raw)
 
     # 5. Eğitim/test ayrımı
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_encoded, y, test_size=0.3, random_state=42, stratify=y
+    X_train, X_test, y_train, y_test, _, X_raw_test = train_test_split(
+        X_encoded, y, X_raw, test_size=0.3, random_state=42, stratify=y
     )
     
     negative_count = sum(y_train == 0)
@@ -156,6 +254,12 @@ def main():
         feature_names = column_transformer.get_feature_names_out()
         json.dump(feature_names.tolist(), f)
     logging.info("🧠 Feature names saved to 'feature_names.json'")
+
+    # 12. Tüm kategori kombinasyonları için skor tablosu
+    save_score_table(model, column_transformer, X_raw_test, X_test)
+
+    # 13. XGBoost'suz servis için ağaçları NumPy dizilerine aktar
+    save_tree_ensemble(model, X_test)
     print(df["user_feedback"].value_counts())
 
 
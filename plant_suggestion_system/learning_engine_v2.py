@@ -3,24 +3,24 @@
 # • Madencilik: Apriori + association_rules (mlxtend)
 # • Çıktı: parsed_rules.json → RuleEngine/KbUpdater şemasında
 # • Yeni: DB bağlantısı opsiyonel; --csv ile offline çalışır.
+# • DB modu artımlı: KB'de son toplanan Feedback id'sinden sonraki (en fazla
+#   BATCH_ROWS) pozitif kayıt madenlenir, kurallar "batch_id" = "ilk-son id"
+#   ile damgalanır → kb_updater sayıları önceki partilerle toplar.
 # --------------------------------------------------------------
 
 from __future__ import annotations
 
 import json
 import logging
-import os
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 from mlxtend.frequent_patterns import fpgrowth, association_rules
 
-
-try:
-    import pyodbc
-except ImportError:  # DB bağlantısı şart değil
-    pyodbc = None
+from kb_journal import read_kb_source
+from kb_updater import mined_through
+from storage import get_storage
 
 # --------------------------------------------------------------
 # Logging
@@ -33,34 +33,27 @@ logger = logging.getLogger(__name__)
 # Veri kaynakları
 # --------------------------------------------------------------
 
-def sql_connect(conn_str: str | None = None):
-    """ODBC connection helper. conn_str None → env → default."""
-    if not pyodbc:
-        raise RuntimeError("pyodbc is not installed – install or use --csv path instead.")
+BATCH_ROWS = 3000  # bir madencilik partisindeki en fazla kayıt
 
-    conn_str = (
-        conn_str
-        or os.getenv("SQLSERVER_CONN")
-        or r"DRIVER={ODBC Driver 17 for SQL Server};SERVER=LAPTOP-7GK6MUOG\\SQLEXPRESS;DATABASE=Smart_Plant_Recomandation_System;Trusted_Connection=yes;"
-    )
-    logger.info("ODBC connecting → %s", conn_str.split("SERVER=")[1].split(";")[0])
-    return pyodbc.connect(conn_str, timeout=5)
 
+def fetch_feedback_from_db(since_id: int = 0, limit: int = BATCH_ROWS) -> pd.DataFrame:
+    """Next batch: positive feedback rows with id > *since_id*, oldest first."""
+    df = get_storage().read_sql(
+        "SELECT * FROM Feedback WHERE id > ? AND user_feedback = 1 ORDER BY id", (since_id,)
+    )
 
-def fetch_feedback_from_db() -> pd.DataFrame:
-    conn = sql_connect()
-    df = pd.read_sql("SELECT * FROM Feedback", conn)
+    # 3000'den fazlaysa ilk 3000 (id sırasıyla) bu parti; kalanı sonraki retrain'e
+    df = df.head(limit)
 
-    # Sadece feedback=1 olan kayıtları al
-    df = df[df["user_feedback"] == 1]
+    logger.info("✅ Fetched %d positive feedback records from DB (id > %d).", len(df), since_id)
+    return df
 
-    # Eğer 3000'den fazlaysa örnekle, değilse olduğu gibi al
-    if len(df) > 3000:
-        df = df.sample(3000, random_state=42)
 
-    conn.close()
-    logger.info("✅ Fetched %d positive feedback records from DB.", len(df))
-    return df
+def batch_id_of(df: pd.DataFrame) -> Optional[str]:
+    """Feedback id range "first-last" of a fetched batch (None if empty)."""
+    if df.empty or "id" not in df:
+        return None
+    return f"{int(df['id'].min())}-{int(df['id'].max())}"
 
 
 # --------------------------------------------------------------
@@ -82,7 +75,12 @@ def _split_item(item: str, cat_cols: List[str]) -> Tuple[str, str]:
     return item[:idx], item[idx + 1 :].replace("_", " ")
 
 
-def _parse_rules(rules_df: pd.DataFrame, feedback_flag: int) -> List[Dict]:
+def _is_plant_item(item) -> bool:
+    return str(item).startswith("suggested_plant_")
+
+
+def _parse_rules(rules_df: pd.DataFrame, feedback_flag: int, n_transactions: int,
+                 batch_id: Optional[str] = None) -> List[Dict]:
     parsed: List[Dict] = []
     for _, row in rules_df.iterrows():
         conds: Dict[str, List[str]] = {}
@@ -91,16 +89,20 @@ def _parse_rules(rules_df: pd.DataFrame, feedback_flag: int) -> List[Dict]:
             conds.setdefault(col, []).append(val)
         plant_item = next(x for x in row["consequents"] if str(x).startswith("suggested_plant_"))
         _, plant_name = _split_item(str(plant_item), ["suggested_plant"])
-        parsed.append(
-            {
-                "conditions": conds,
-                "suggested_plant": plant_name,
-                "feedback": feedback_flag,
-                "support": float(row["support"]),
-                "confidence": float(row["confidence"]),
-                "lift": float(row["lift"]),
-            }
-        )
+        rule = {
+            "conditions": conds,
+            "suggested_plant": plant_name,
+            "feedback": feedback_flag,
+            "support": float(row["support"]),
+            "confidence": float(row["confidence"]),
+            "lift": float(row["lift"]),
+            "n_transactions": int(n_transactions),
+        }
+        # batch_id yok (--csv, tüm veri) → kb_updater istatistikleri değiştirir;
+        # varsa bu parti önceki partilerle toplanır
+        if batch_id is not None:
+            rule["batch_id"] = batch_id
+        parsed.append(rule)
     return parsed
 
 # --------------------------------------------------------------
@@ -113,14 +115,15 @@ def mine_association_rules(
     min_support: float = 0.005,
     min_confidence: float = 0.1,
     output_path: str = "parsed_rules.json",
-) -> None:
+    batch_id: Optional[str] = None,
+) -> List[Dict]:
     parsed: List[Dict] = []
 
     def _mine(df_sub: pd.DataFrame, flag: int):
         if df_sub.empty:
             logger.info("No records for feedback=%d", flag)
             return
-        trans = pd.get_dummies(df_sub[CAT_COLS].astype(str))
+        trans = pd.get_dummies(df_sub[CAT_COLS + ["suggested_plant"]].astype(str))
             # --- Apriori: en fazla 2 koşullu item-set + daha güçlü kural seçimi
         freq = fpgrowth(
             trans,
@@ -137,15 +140,17 @@ def mine_association_rules(
 
        
 
+        # Sonuç tek bir bitki, koşullar yalnızca form alanları
         rules = rules[
-            rules["consequents"].apply(lambda idx: any(str(x).startswith("suggested_plant_") for x in idx))
+            rules["consequents"].apply(lambda idx: len(idx) == 1 and _is_plant_item(next(iter(idx))))
+            & ~rules["antecedents"].apply(lambda idx: any(_is_plant_item(x) for x in idx))
         ]
 
          # Lift’e göre sırala, ilk 500 kuralı tut
         rules = rules.sort_values("lift", ascending=False).head(100)
 
         logger.info("feedback=%d → %d rules after filter", flag, len(rules))
-        parsed.extend(_parse_rules(rules, flag))
+        parsed.extend(_parse_rules(rules, flag, len(df_sub), batch_id))
 
     _mine(df[df["user_feedback"] == 1], 1)
     _mine(df[df["user_feedback"] == 0], 0)
@@ -154,6 +159,28 @@ def mine_association_rules(
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(parsed, f, ensure_ascii=False, indent=2)
     logger.info("Saved %d parsed rules → %s", len(parsed), output_path)
+    return parsed
+
+
+def mine_next_batch(
+    kb_path: str = "knowledge_base.json",
+    *,
+    min_support: float = 0.005,
+    min_confidence: float = 0.1,
+    output_path: str = "parsed_rules.json",
+) -> Optional[str]:
+    """Mine the Feedback rows not yet pooled into *kb_path*; returns the batch_id (None if no new rows)."""
+    since_id = mined_through(read_kb_source(kb_path)[0]) if Path(kb_path).exists() else 0
+    df = fetch_feedback_from_db(since_id)
+    batch_id = batch_id_of(df)
+    parsed = mine_association_rules(
+        df, min_support=min_support, min_confidence=min_confidence,
+        output_path=output_path, batch_id=batch_id,
+    )
+    if batch_id is not None and not parsed:
+        # Kural çıkmazsa KB'deki son id ilerlemez; bu kayıtlar sonraki partide tekrar okunur
+        logger.warning("No rules in batch %s – lower --min-support / --min-confidence?", batch_id)
+    return batch_id
 
 # --------------------------------------------------------------
 # CLI
@@ -166,21 +193,26 @@ if __name__ == "__main__":
     parser.add_argument("--min-support", type=float, default=0.01)
     parser.add_argument("--min-confidence", type=float, default=0.3)
     parser.add_argument("--output", default="parsed_rules.json")
+    parser.add_argument("--kb", default="knowledge_base.json", help="KB whose pooled batches set the next DB batch")
     args = parser.parse_args()
 
     if args.csv:
         df_feedback = pd.read_csv(args.csv)
         logger.info("Loaded %d records from CSV %s", len(df_feedback), args.csv)
+        mine_association_rules(
+            df_feedback,
+            min_support=args.min_support,
+            min_confidence=args.min_confidence,
+            output_path=args.output,
+        )
     else:
         try:
-            df_feedback = fetch_feedback_from_db()
+            mine_next_batch(
+                args.kb,
+                min_support=args.min_support,
+                min_confidence=args.min_confidence,
+                output_path=args.output,
+            )
         except Exception as exc:
-            logger.error("DB connection failed (%s). Tip: set SQLSERVER_CONN env or use --csv.", exc)
+            logger.error("DB connection failed (%s). Tip: set SQLSERVER_CONN / PLANT_DB_BACKEND=sqlite or use --csv.", exc)
             raise SystemExit(1)
-
-    mine_association_rules(
-        df_feedback,
-        min_support=args.min_support,
-        min_confidence=args.min_confidence,
-        output_path=args.output,
-    )
@@ -0,0 +1,163 @@
+# resources.py – Process‑wide serving resources (model, encoder, KB, plants)
+# --------------------------------------------------------------
+# Streamlit re‑executes app.py on every interaction, but imported modules
+# live for the whole process and are shared by all sessions. Each resource
+# here is loaded once and rebuilt only when its *signature* changes:
+#
+#   scoring models → mtime/size of the files under models/
+#   plant catalog  → plants table fingerprint (checked at most every N s)
+#   rule engine    → plant catalog version (the KB hot‑reloads itself)
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+import joblib
+import pandas as pd
+
+from data_handling import load_plants, plants_fingerprint
+from feature_encoder import CompiledEncoder
+from rule_engine import RuleEngine
+from score_table import MODEL_PATH, SCORE_TABLE_PATH, ScoreTable
+from tree_ensemble import TREES_PATH, TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+VECTORIZER_PATH = "models/feedback_vec.pkl"
+KB_PATH = "knowledge_base.json"
+VETO_MODE = os.environ.get("PLANT_VETO_MODE", "off")  # off | profile | plant
+PLANTS_CHECK_INTERVAL = 30.0  # saniye – plants tablosu fingerprint sorgu aralığı
+
+_MISSING = object()
+
+
+def file_signature(*paths: str) -> tuple:
+    """(mtime_ns, size) for each path; None for files that do not exist."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class CachedResource:
+    """Lazily loaded value shared by all sessions, reloaded on signature change."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        signature: Callable[[], Hashable],
+        check_interval: float = 0.0,
+        cache_if: Callable[[Any], bool] = lambda value: True,
+    ) -> None:
+        self.name = name
+        self.loader = loader
+        self.signature = signature
+        self.check_interval = check_interval
+        self.cache_if = cache_if
+        self.version = 0
+        self._value: Any = _MISSING
+        self._sig: Hashable = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        now = time.monotonic()
+        if self._value is not _MISSING and now - self._checked < self.check_interval:
+            return self._value
+
+        with self._lock:
+            try:
+                sig = self.signature()
+            except Exception as exc:
+                if self._value is _MISSING:
+                    raise
+                logger.warning("Resource '%s' signature check failed (%s) – serving cached copy", self.name, exc)
+                self._checked = now
+                return self._value
+            if self._value is _MISSING or sig != self._sig:
+                value = self.loader()
+                if not self.cache_if(value):
+                    return value  # başarısız yükleme cache'lenmez
+                self._value, self._sig = value, sig
+                self.version += 1
+                logger.info("♻️ Resource '%s' loaded (v%d)", self.name, self.version)
+            self._checked = now
+            return self._value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = _MISSING
+
+
+# --------------------------------------------------------------
+# 🧠 Scoring models
+# --------------------------------------------------------------
+@dataclass(frozen=True)
+class ScoringModels:
+    """Whatever the app needs to score: table lookup, or encoder + model."""
+
+    score_table: Optional[ScoreTable]
+    model: Any = None
+    encoder: Optional[CompiledEncoder] = None
+
+
+def _load_scoring_models() -> ScoringModels:
+    # Skor tablosu güncelse XGBoost / vectorizer hiç yüklenmez
+    table = ScoreTable.load_if_current(SCORE_TABLE_PATH, MODEL_PATH)
+    if table is not None:
+        return ScoringModels(table)
+
+    # NumPy ağaç export'u varsa pickled XGBClassifier yerine onu kullan
+    model = TreeEnsemble.load_if_current(TREES_PATH, MODEL_PATH)
+    if model is None:
+        model = joblib.load(MODEL_PATH)
+    encoder = CompiledEncoder.from_transformer(joblib.load(VECTORIZER_PATH))
+    return ScoringModels(None, model, encoder)
+
+
+_scoring_models = CachedResource(
+    "scoring_models",
+    _load_scoring_models,
+    lambda: file_signature(MODEL_PATH, VECTORIZER_PATH, SCORE_TABLE_PATH, TREES_PATH),
+)
+
+# --------------------------------------------------------------
+# 🌱 Plant catalog & rule engine
+# --------------------------------------------------------------
+_plants = CachedResource(
+    "plants",
+    load_plants,
+    plants_fingerprint,
+    check_interval=PLANTS_CHECK_INTERVAL,
+    cache_if=lambda df: not df.empty,
+)
+
+_rule_engine = CachedResource(
+    "rule_engine",
+    lambda: RuleEngine(_plants.get(), kb_path=KB_PATH, veto_mode=VETO_MODE),
+    lambda: _plants.version,
+)
+
+
+def get_scoring_models() -> ScoringModels:
+    return _scoring_models.get()
+
+
+def get_plants() -> pd.DataFrame:
+    return _plants.get()
+
+
+def get_rule_engine() -> RuleEngine:
+    get_plants()  # katalog değiştiyse önce onu tazele
+    return _rule_engine.get()
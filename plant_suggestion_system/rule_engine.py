@@ -18,84 +18,652 @@
 
 from __future__ import annotations
 
+import hashlib
+import heapq
+import itertools
 import json
 import logging
-from dataclasses import dataclass
-from typing import Dict, List, Set
-
+import os
+import threading
+import time
+from math import comb
+from dataclasses import FrozenInstanceError
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
 
+from kb_journal import apply_journal, journal_path_for, parse_journal, read_kb_bytes, source_digest
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# --------------------------------------------------------------
+# 🗂️ Profile schema – every value the UI form can produce
+# --------------------------------------------------------------
+PROFILE_SPACE: Dict[str, List[str]] = {
+    "area_size":            ["Mini", "Small", "Medium", "Large"],
+    "sunlight_need":        ["Can live in shade", "1-2 hours daily", "Bright indirect light", "6+ hours"],
+    "environment_type":     ["Indoor", "Outdoor", "Semi-outdoor"],
+    "climate_type":         ["All seasons", "Spring", "Summer", "Winter"],
+    "watering_frequency":   ["Daily", "Weekly", "Bi-weekly", "Every 2-3 days", "Monthly"],
+    "fertilizer_frequency": ["Monthly", "1-2 times a year", "Never needed"],
+    "pesticide_frequency":  ["Monthly", "1-2 times a year", "Never needed"],
+    "has_pet":              ["Yes", "No"],
+    "has_child":            ["Yes", "No"],
+}
+
 # --------------------------------------------------------------
 # 📐 Data structures
 # --------------------------------------------------------------
-@dataclass(frozen=True)
-class Rule:
-    """Immutable representation of a single IF–THEN rule."""
+ProfileKey = Tuple[Tuple[str, str], ...]
 
-    conditions: Dict[str, str]
-    suggested_plant: str
-    feedback: int = 1
-    confidence: float = 1.0
-    lift: float = 1.0
-    support: float = 0.0
 
-    def matches(self, user_input: Dict[str, str], exact: bool = False) -> bool:
- 
-        rule_items = self.conditions.items()
-        user_items = user_input.items()
+def canonical_profile(profile: Dict[str, str]) -> ProfileKey:
+    """Hashable, order‑independent key for a condition dict / user profile."""
+    return tuple(sorted(profile.items()))
 
-        if exact:
-            return rule_items == user_items  # birebir aynı olmalı
-        return rule_items <= user_items  # subset (içeriyor mu)
 
+def catalog_digest(plant_names: Iterable[str]) -> str:
+    """sha256 of the ordered plant catalog used for step‑5 filling."""
+    return hashlib.sha256("\n".join(str(p) for p in plant_names).encode("utf-8")).hexdigest()
 
 
-class KnowledgeBase:
-    """Load & organise rules / meta‑rules / frames from JSON."""
+class KBVocab:
+    """Interned (attribute, value) pairs and plant names of one KB snapshot.
 
-    def __init__(self, kb_path: str = "knowledge_base.json") -> None:
-        with open(kb_path, "r", encoding="utf-8") as f:
-            kb = json.load(f)
+    Lookups are lock‑free; assigning a new code takes a lock, so concurrent
+    request threads can never hand out the same code for different items.
+    """
 
-        def _strip(rule_dict: dict) -> dict:
-            return {
-                "conditions":      rule_dict["conditions"],
-                "suggested_plant": rule_dict["suggested_plant"],
-                "feedback":        rule_dict.get("feedback", 1),
-                "confidence":      rule_dict.get("confidence", 1.0),
-                "lift":            rule_dict.get("lift", 1.0),
-                "support":         rule_dict.get("support", 0.0),
-            }
+    def __init__(self, pairs: Sequence[Tuple[str, str]] = (), plants: Sequence[str] = ()) -> None:
+        self.pairs: List[Tuple[str, str]] = [tuple(p) for p in pairs]
+        self.pair_codes: Dict[Tuple[str, str], int] = {p: i for i, p in enumerate(self.pairs)}
+        self.plants: List[str] = list(plants)
+        self.plant_codes: Dict[str, int] = {p: i for i, p in enumerate(self.plants)}
+        self._lock = threading.Lock()
 
+    def pair_code(self, attr: str, value: str) -> int:
+        item = (attr, value)
+        code = self.pair_codes.get(item)
+        if code is None:
+            with self._lock:
+                code = self.pair_codes.get(item)
+                if code is None:
+                    code = len(self.pairs)
+                    self.pairs.append(item)       # önce liste: kodu gören okuyucu çözebilsin
+                    self.pair_codes[item] = code
+        return code
+
+    def plant_code(self, plant: str) -> int:
+        code = self.plant_codes.get(plant)
+        if code is None:
+            with self._lock:
+                code = self.plant_codes.get(plant)
+                if code is None:
+                    code = len(self.plants)
+                    self.plants.append(plant)
+                    self.plant_codes[plant] = code
+        return code
+
+
+class Rule:
+    """Immutable representation of a single IF–THEN rule.
+
+    Conditions are kept as a sorted tuple of interned pair codes (plus the
+    plant code) instead of a per‑rule dict; ``conditions`` and
+    ``suggested_plant`` are decoded on access, so the public API is unchanged.
+    """
+
+    __slots__ = ("vocab", "codes", "plant_code", "feedback", "confidence", "lift", "support")
+
+    def __init__(self, conditions: Dict[str, str], suggested_plant: str, feedback: int = 1,
+                 confidence: float = 1.0, lift: float = 1.0, support: float = 0.0,
+                 vocab: Optional[KBVocab] = None) -> None:
+        vocab = vocab or KBVocab()  # KB dışı kural: kendi küçük sözlüğü, global tablo büyümez
+        codes = tuple(sorted(vocab.pair_code(a, v) for a, v in conditions.items()))
+        self._set(vocab, codes, vocab.plant_code(suggested_plant), feedback, confidence, lift, support)
+
+    @classmethod
+    def from_codes(cls, vocab: KBVocab, codes: Tuple[int, ...], plant_code: int, feedback: int = 1,
+                   confidence: float = 1.0, lift: float = 1.0, support: float = 0.0) -> "Rule":
+        """Build from already interned codes (*codes* must be sorted)."""
+        rule = cls.__new__(cls)
+        rule._set(vocab, codes, plant_code, feedback, confidence, lift, support)
+        return rule
+
+    def _set(self, *values) -> None:
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+    @property
+    def conditions(self) -> Dict[str, str]:
+        pairs = self.vocab.pairs
+        return dict(pairs[c] for c in self.codes)
+
+    @property
+    def suggested_plant(self) -> str:
+        return self.vocab.plants[self.plant_code]
+
+    def _key(self) -> tuple:
+        return (frozenset(self.vocab.pairs[c] for c in self.codes), self.suggested_plant,
+                self.feedback, self.confidence, self.lift, self.support)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Rule):
+            return NotImplemented
+        if self.vocab is other.vocab:
+            return (self.codes, self.plant_code, self.feedback, self.confidence, self.lift, self.support) == \
+                   (other.codes, other.plant_code, other.feedback, other.confidence, other.lift, other.support)
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return (f"Rule(conditions={self.conditions!r}, suggested_plant={self.suggested_plant!r}, "
+                f"feedback={self.feedback!r}, confidence={self.confidence!r}, lift={self.lift!r}, "
+                f"support={self.support!r})")
+
+    def __reduce__(self):
+        return (Rule, (self.conditions, self.suggested_plant, self.feedback,
+                       self.confidence, self.lift, self.support))
+
+    def matches(self, user_input: Dict[str, str], exact: bool = False) -> bool:
+
+        if exact and len(user_input) != len(self.codes):
+            return False  # birebir aynı olmalı
+        missing = object()
+        pairs = self.vocab.pairs
+        for code in self.codes:  # subset (içeriyor mu)
+            attr, value = pairs[code]
+            if user_input.get(attr, missing) != value:
+                return False
+        return True
+
+
+class RuleColumns:
+    """Struct‑of‑arrays storage for one rule list (positive or negative).
+
+    Conditions of rule *i* are ``cond_codes[cond_offsets[i]:cond_offsets[i+1]]``
+    (interned pair codes, original JSON order). The same arrays back both the
+    in‑memory JSON load and the memory‑mapped compiled KB (kb_compiler.py).
+    """
+
+    FIELDS = ("cond_offsets", "cond_codes", "plant", "feedback", "confidence", "lift", "support")
+
+    def __init__(self, cond_offsets: np.ndarray, cond_codes: np.ndarray, plant: np.ndarray,
+                 feedback: np.ndarray, confidence: np.ndarray, lift: np.ndarray, support: np.ndarray) -> None:
+        self.cond_offsets = cond_offsets
+        self.cond_codes = cond_codes
+        self.plant = plant
+        self.feedback = feedback
+        self.confidence = confidence
+        self.lift = lift
+        self.support = support
+
+    @classmethod
+    def from_dicts(cls, rule_dicts: Sequence[dict], vocab: KBVocab) -> "RuleColumns":
+        offsets, codes, plant = [0], [], []
+        feedback, confidence, lift, support = [], [], [], []
+        for r in rule_dicts:
+            codes.extend(vocab.pair_code(a, v) for a, v in r["conditions"].items())
+            offsets.append(len(codes))
+            plant.append(vocab.plant_code(r["suggested_plant"]))
+            feedback.append(r.get("feedback", 1))
+            confidence.append(r.get("confidence", 1.0))
+            lift.append(r.get("lift", 1.0))
+            support.append(r.get("support", 0.0))
+        return cls(
+            np.asarray(offsets, dtype=np.int64),
+            np.asarray(codes, dtype=np.int32),
+            np.asarray(plant, dtype=np.int32),
+            np.asarray(feedback, dtype=np.int8),
+            np.asarray(confidence, dtype=np.float64),
+            np.asarray(lift, dtype=np.float64),
+            np.asarray(support, dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.plant)
+
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.cond_offsets)
+
+    def codes_of(self, pos: int) -> np.ndarray:
+        return self.cond_codes[self.cond_offsets[pos]:self.cond_offsets[pos + 1]]
+
+    def rank_order(self) -> np.ndarray:
+        """Positions sorted by (confidence, lift) desc, KB order on ties (stable)."""
+        n = len(self)
+        return np.lexsort((np.arange(n), -self.lift, -self.confidence)) if n else np.empty(0, dtype=np.int64)
+
+
+class RuleList(Sequence):
+    """Read‑only ``List[Rule]`` view that materialises rules on access."""
+
+    def __init__(self, columns: RuleColumns, vocab: KBVocab) -> None:
+        self.columns = columns
+        self.vocab = vocab
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        c = self.columns
+        return Rule.from_codes(
+            self.vocab,
+            tuple(sorted(c.codes_of(pos).tolist())),
+            int(c.plant[pos]),
+            feedback=int(c.feedback[pos]),
+            confidence=float(c.confidence[pos]),
+            lift=float(c.lift[pos]),
+            support=float(c.support[pos]),
+        )
 
-        self.positive_rules: List[Rule] = [
-            Rule(**_strip(r)) for r in kb.get("positive_rules", [])
-        ]
-        self.negative_rules: List[Rule] = [
-            Rule(**_strip(r)) for r in kb.get("negative_rules", [])
-        ]
 
-        self.meta_rules: List[dict] = kb.get("meta_rules", [])
-        self.frames: Dict[str, List[str]] = kb.get("frames", {})
+class RuleIndex:
+    """Inverted (attribute, value) → rule position index over a rule list.
+
+    A rule matches a profile when every one of its conditions is hit, so
+    counting posting-list hits per rule replaces the full subset scan and the
+    lookup cost only depends on the rules that share items with the profile.
+    """
+
+    def __init__(self, columns: RuleColumns, vocab: KBVocab) -> None:
+        self.pair_codes = vocab.pair_codes
+        sizes = columns.sizes()
+        self.sizes: List[int] = sizes.tolist()
+        self.unconditional: List[int] = np.flatnonzero(sizes == 0).tolist()  # koşulsuz kurallar her profile uyar
+
+        # pair code → artan sıralı kural pozisyonları
+        owner = np.repeat(np.arange(len(columns)), sizes)
+        order = np.argsort(columns.cond_codes, kind="stable")
+        codes, starts = np.unique(columns.cond_codes[order], return_index=True)
+        self.postings: Dict[int, List[int]] = {
+            int(code): chunk.tolist()
+            for code, chunk in zip(codes, np.split(owner[order], starts[1:]))
+        }
+
+    def any_match(self, user_input: Dict[str, str]) -> bool:
+        """True as soon as one rule's conditions are all hit (early exit)."""
+        if self.unconditional:
+            return True
+        hits: Dict[int, int] = {}
+        for item in user_input.items():
+            for pos in self.postings.get(self.pair_codes.get(item), ()):
+                n = hits[pos] = hits.get(pos, 0) + 1
+                if n == self.sizes[pos]:
+                    return True
+        return False
+
+    def matching(self, user_input: Dict[str, str], ordered: bool = True) -> List[int]:
+        """Return positions (KB order unless *ordered* is False) of rules whose conditions ⊆ *user_input*."""
+        hits: Dict[int, int] = {}
+        for item in user_input.items():
+            for pos in self.postings.get(self.pair_codes.get(item), ()):
+                hits[pos] = hits.get(pos, 0) + 1
+
+        matched = [pos for pos, n in hits.items() if n == self.sizes[pos]]
+        matched.extend(self.unconditional)
+        if ordered:
+            matched.sort()
+        return matched
+
+
+class VetoIndex:
+    """Negative rules keyed by their sorted condition codes → vetoed plants.
+
+    A profile with *n* known items only has Σ C(n, k) candidate condition
+    sets (k = rule sizes present in the KB, ≤ 382 for the 9‑field form), so
+    enumerating them and probing the dict is independent of how many negative
+    rules there are. If enumeration would cost more than walking the posting
+    lists, the ordinary RuleIndex is used instead.
+    """
+
+    def __init__(self, columns: RuleColumns, vocab: KBVocab, index: RuleIndex) -> None:
+        self.vocab = vocab
+        self.index = index
+        self.plant_ids = columns.plant
+        self.table: Dict[Tuple[int, ...], int] = {}  # key → vetoed plant bitset
+        for pos, plant in enumerate(columns.plant.tolist()):
+            key = tuple(sorted(columns.codes_of(pos).tolist()))
+            bits = self.table.get(key, 0)
+            if vocab.plants[plant]:
+                bits |= 1 << plant
+            self.table[key] = bits
+        self.key_sizes: List[int] = sorted({len(k) for k in self.table})
+
+    def _combos(self, user_input: Dict[str, str]):
+        """Candidate keys, or None if the posting-list walk is cheaper."""
+        codes = sorted(c for c in map(self.vocab.pair_codes.get, user_input.items()) if c is not None)
+        sizes = [k for k in self.key_sizes if k <= len(codes)]
+        cost = sum(comb(len(codes), k) for k in sizes)
+        if cost > sum(len(self.index.postings.get(c, ())) for c in codes):
+            return None
+        return itertools.chain.from_iterable(itertools.combinations(codes, k) for k in sizes)
+
+    def vetoes(self, user_input: Dict[str, str]) -> bool:
+        combos = self._combos(user_input)
+        if combos is None:
+            return self.index.any_match(user_input)
+        return any(key in self.table for key in combos)
+
+    def plants(self, user_input: Dict[str, str]) -> frozenset:
+        combos = self._combos(user_input)
+        if combos is None:
+            plants, names = self.plant_ids, self.vocab.plants
+            return frozenset(p for p in (names[plants[pos]] for pos in self.index.matching(user_input)) if p)
+        get, bits = self.table.get, 0
+        for key in combos:
+            bits |= get(key, 0)
+        names = self.vocab.plants
+        return frozenset(names[pid] for pid in _bit_ids(bits))
+
+
+class MetaRules:
+    """Meta‑rules and frames compiled to bitsets.
+
+    Frames become plant‑id bitsets (Python ints over the snapshot's plant
+    codes) plus their ordered plant ids; meta‑rule conditions become
+    bitmasks over the same pair codes the positive rules use, so
+    "conditions ⊆ profile" is ``cond & profile == cond``.
+    """
+
+    def __init__(self, meta_rules: List[dict], frames: Dict[str, List[str]], vocab: KBVocab) -> None:
+        self.vocab = vocab
+        frame_ids = {name: i for i, name in enumerate(frames)}
+        self.frame_plants: List[Tuple[int, ...]] = [
+            tuple(vocab.plant_code(p) for p in plants) for plants in frames.values()
+        ]
+        self.frame_bits: List[int] = [_bitset(ids) for ids in self.frame_plants]
+
+        self.conditions: List[int] = []          # pair‑code bitmask per meta‑rule
+        self.suggest: List[Tuple[int, ...]] = []  # frame ids, KB sırasıyla
+        self.exclude: List[int] = []             # dışlanan bitkilerin bitset'i
+        for meta in meta_rules:
+            self.conditions.append(_bitset(vocab.pair_code(a, v) for a, v in meta.get("conditions", {}).items()))
+            self.suggest.append(tuple(frame_ids[f] for f in meta.get("suggested_types", []) if f in frame_ids))
+            excluded = 0
+            for f in meta.get("excluded_types", []):
+                if f in frame_ids:
+                    excluded |= self.frame_bits[frame_ids[f]]
+            self.exclude.append(excluded)
+
+    def __len__(self) -> int:
+        return len(self.conditions)
+
+    def profile_mask(self, user_input: Dict[str, str]) -> int:
+        codes = self.vocab.pair_codes
+        return _bitset(code for code in map(codes.get, user_input.items()) if code is not None)
+
+    def plant_mask(self, plants: Sequence[str]) -> int:
+        codes = self.vocab.plant_codes
+        return _bitset(code for code in map(codes.get, plants) if code is not None)
+
+    def resolve(self, user_input: Dict[str, str]) -> Tuple[List[int], int]:
+        """(suggested frame ids in first‑mention order, excluded plant bitset)."""
+        profile = self.profile_mask(user_input)
+        frames: Dict[int, None] = {}
+        excluded = 0
+        for cond, suggest, exclude in zip(self.conditions, self.suggest, self.exclude):
+            if cond & profile == cond:
+                frames.update(dict.fromkeys(suggest))
+                excluded |= exclude
+        return list(frames), excluded
+
+
+def _bitset(codes) -> int:
+    bits = 0
+    for code in codes:
+        bits |= 1 << code
+    return bits
+
+
+def _bit_ids(bits: int) -> Iterator[int]:
+    return (i for i in range(bits.bit_length()) if bits >> i & 1)
+
+
+class KBSnapshot:
+    """Immutable, fully indexed view of one version of the knowledge base."""
+
+    def __init__(self, vocab: KBVocab, positive: RuleColumns, negative: RuleColumns,
+                 meta_rules: List[dict], frames: Dict[str, List[str]], digest: str = "") -> None:
+        self.digest = digest  # sha256 of the source JSON
+        self.vocab = vocab
+        self.positive = positive
+        self.negative = negative
+
+        self.positive_rules = RuleList(positive, vocab)
+        self.negative_rules = RuleList(negative, vocab)
+
+        self.meta_rules: List[dict] = meta_rules
+        self.frames: Dict[str, List[str]] = frames
+
+        # Inverted indexes + ranking – built once per load, reused by every request
+        self.positive_index = RuleIndex(positive, vocab)
+        self.negative_index = RuleIndex(negative, vocab)
+        self.positive_order = positive.rank_order()
+        self.positive_rank = np.empty(len(positive), dtype=np.int64)
+        self.positive_rank[self.positive_order] = np.arange(len(positive))
+        self.ranked_plants = positive.plant[self.positive_order]  # rank → plant code
+        self.meta = MetaRules(meta_rules, frames, vocab)
+        self._exact_table: Optional[Dict[Tuple[int, ...], List[str]]] = None
+        self._veto_index: Optional[VetoIndex] = None
 
         logger.info(
-            "KB loaded – % d positive, % d negative, % d meta‑rules, % d frames",
+            "KB loaded – % d positive, % d negative, % d meta‑rules, % d frames",
             len(self.positive_rules), len(self.negative_rules), len(self.meta_rules), len(self.frames)
         )
 
+    @classmethod
+    def from_dict(cls, kb: dict, digest: str = "") -> "KBSnapshot":
+        vocab = KBVocab()
+        positive = RuleColumns.from_dicts(kb.get("positive_rules", []), vocab)
+        negative = RuleColumns.from_dicts(kb.get("negative_rules", []), vocab)
+        return cls(vocab, positive, negative, kb.get("meta_rules", []), kb.get("frames", {}), digest)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "KBSnapshot":
+        return cls.from_dict(json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest())
+
+    # ----------------------------------------------------------
+    # Exact‑profile lookup
+    # ----------------------------------------------------------
+    def _build_exact_table(self) -> Dict[Tuple[int, ...], List[str]]:
+        """Map sorted pair‑code tuples → plants, best (confidence, lift) first."""
+        table: Dict[Tuple[int, ...], List[str]] = {}
+        for pos in self.positive_order.tolist():
+            key = tuple(sorted(self.positive.codes_of(pos).tolist()))
+            plant = self.vocab.plants[self.positive.plant[pos]]
+            plants = table.setdefault(key, [])
+            if plant not in plants:
+                plants.append(plant)
+        return table
+
+    def exact_match(self, user_input: Dict[str, str]) -> List[str]:
+        """Return plants of rules whose conditions equal *user_input* exactly (O(1))."""
+        if self._exact_table is None:  # ilk çağrıda kurulur (derlenmiş KB'de açılışı hızlandırır)
+            self._exact_table = self._build_exact_table()
+        codes = [self.vocab.pair_codes.get(item) for item in user_input.items()]
+        if None in codes:
+            return []
+        return list(self._exact_table.get(tuple(sorted(codes)), []))
+
+    @property
+    def veto_index(self) -> VetoIndex:
+        if self._veto_index is None:  # sadece veto açıkken, ilk kullanımda kurulur
+            self._veto_index = VetoIndex(self.negative, self.vocab, self.negative_index)
+        return self._veto_index
+
+
+def _file_stamp(path: str) -> tuple:
+    """(mtime_ns, size) of the KB file plus its journal's (None if absent)."""
+    st = os.stat(path)
+    try:
+        js = os.stat(journal_path_for(path))
+        journal = (js.st_mtime_ns, js.st_size)
+    except FileNotFoundError:
+        journal = None
+    return st.st_mtime_ns, st.st_size, journal
+
+
+def load_snapshot(path: str, known_digest: Optional[str] = None) -> Optional[KBSnapshot]:
+    """Load a JSON or compiled (kb_compiler) KB; None if its digest equals *known_digest*."""
+    from kb_compiler import is_compiled_kb, load_compiled_kb, read_compiled_header
+
+    if is_compiled_kb(path):
+        if known_digest is not None and read_compiled_header(path)["digest"] == known_digest:
+            return None
+        return load_compiled_kb(path)
+
+    raw, journal = read_kb_bytes(path)  # snapshot + journal kuyruğu, kilitsiz
+    digest = source_digest(raw, journal)
+    if known_digest is not None and digest == known_digest:
+        return None
+    kb = json.loads(raw.decode("utf-8"))
+    if journal:
+        apply_journal(kb, parse_journal(journal))
+    return KBSnapshot.from_dict(kb, digest)
+
+
+class KnowledgeBase:
+    """Load & organise rules / meta‑rules / frames from JSON (+ journal) or a compiled KB.
+
+    Holds the current :class:`KBSnapshot`. :meth:`snapshot` does a throttled
+    mtime/size check; when the file changed (and its sha256 differs) a new
+    snapshot is built in a background thread and swapped in with a single
+    reference assignment, so readers never see a half‑loaded KB.
+    """
+
+    def __init__(self, kb_path: str = "knowledge_base.json", check_interval: float = 1.0) -> None:
+        self.kb_path = kb_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._reloader: Optional[threading.Thread] = None
+        self._checked = 0.0
+        self.reload()
+
+    def reload(self) -> None:
+        """(Re)read the KB file and rebuild every derived index (synchronous)."""
+        stamp = _file_stamp(self.kb_path)
+        self._snapshot = load_snapshot(self.kb_path)
+        self._stamp = stamp
+
+    # ----------------------------------------------------------
+    # Hot reload
+    # ----------------------------------------------------------
+    def snapshot(self) -> KBSnapshot:
+        """Current snapshot – grab once per request and use it throughout."""
+        self.refresh_if_changed()
+        return self._snapshot
+
+    def refresh_if_changed(self) -> bool:
+        """Cheap stat check; start a background rebuild if the file changed."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        try:
+            if _file_stamp(self.kb_path) == self._stamp:
+                return False
+        except OSError:
+            return False
+
+        with self._lock:
+            if self._reloader is not None and self._reloader.is_alive():
+                return False
+            self._reloader = threading.Thread(target=self._background_reload, name="kb-reload", daemon=True)
+            self._reloader.start()
+        return True
+
+    def wait_for_reload(self, timeout: Optional[float] = None) -> None:
+        """Block until a running background reload finishes (CLI / tooling)."""
+        reloader = self._reloader
+        if reloader is not None:
+            reloader.join(timeout)
+
+    def _background_reload(self) -> None:
+        try:
+            stamp = _file_stamp(self.kb_path)
+            snapshot = load_snapshot(self.kb_path, known_digest=self._snapshot.digest)
+            if snapshot is None:
+                self._stamp = stamp  # sadece mtime değişmiş, içerik aynı
+                return
+        except (OSError, ValueError) as exc:
+            # yarım yazılmış dosya vb. – eski snapshot'la devam, sonraki kontrolde tekrar dene
+            logger.warning("KB reload failed (%s) – keeping previous snapshot", exc)
+            return
+        self._snapshot, self._stamp = snapshot, stamp  # atomik referans değişimi
+        logger.info("🔄 KB hot‑reloaded (%s…)", snapshot.digest[:12])
+
+    # ----------------------------------------------------------
+    # Convenience views on the current snapshot
+    # ----------------------------------------------------------
+    @property
+    def positive_rules(self) -> RuleList:
+        return self._snapshot.positive_rules
+
+    @property
+    def negative_rules(self) -> RuleList:
+        return self._snapshot.negative_rules
+
+    @property
+    def meta_rules(self) -> List[dict]:
+        return self._snapshot.meta_rules
+
+    @property
+    def frames(self) -> Dict[str, List[str]]:
+        return self._snapshot.frames
+
+    @property
+    def positive_index(self) -> RuleIndex:
+        return self._snapshot.positive_index
+
+    @property
+    def negative_index(self) -> RuleIndex:
+        return self._snapshot.negative_index
+
+    def exact_match(self, user_input: Dict[str, str]) -> List[str]:
+        return self._snapshot.exact_match(user_input)
+
 
 # --------------------------------------------------------------
 # 🧠 Rule Engine
 # --------------------------------------------------------------
-class RuleEngine:
-    """Kural tabanlı aday üretici katman."""
+VETO_MODES = ("off", "profile", "plant")
+
 
-    def __init__(self, plants_df: pd.DataFrame, kb_path: str = "knowledge_base.json") -> None:
+class RuleEngine:
+    """Kural tabanlı aday üretici katman.
+
+    ``veto_mode`` controls the negative rules ("ÖNERME"):
+      • "off"     – ignored (default, previous behaviour)
+      • "profile" – any matching negative rule vetoes the whole profile → []
+      • "plant"   – plants of matching negative rules are never suggested
+    """
+
+    def __init__(self, plants_df: pd.DataFrame, kb_path: str = "knowledge_base.json",
+                 veto_mode: str = "off") -> None:
+        if veto_mode not in VETO_MODES:
+            raise ValueError(f"veto_mode must be one of {VETO_MODES}, got {veto_mode!r}")
         self.plants_df = plants_df.copy()
+        self.catalog: List[str] = self.plants_df["plant_name"].dropna().unique().tolist()  # Step 5 listesi
+        self.catalog_sha256 = catalog_digest(self.catalog)  # candidate_table tazelik kontrolü için bir kez
         self.kb = KnowledgeBase(kb_path)
+        self.veto_mode = veto_mode
+        if veto_mode != "off":
+            self.kb.snapshot().veto_index  # ilk isteğe yük bindirmemek için önceden kur
 
     # ----------------------------------------------------------
     # Public API
@@ -107,92 +675,293 @@ class RuleEngine:
 
     def get_candidates(self, user_input: Dict[str, str], top_n: int = 5) -> List[str]:
         """Return up to *top_n* plant names matching the rule logic."""
+        return self._candidates(user_input, top_n, self.kb.snapshot())  # tek istek boyunca aynı KB sürümü
+
+    def iter_candidate_pages(self, user_input: Dict[str, str], size: int = 5,
+                             first_page: Optional[List[str]] = None) -> Iterator[List[str]]:
+        """Pages of up to *size* candidates for this profile ("show me more").
+
+        Page 1 is exactly :meth:`get_candidates` (or *first_page*, when the
+        caller already has it, e.g. from candidate_table). Later pages continue
+        the ranked stream – exact matches, partial matches, meta‑rule frames,
+        then the plant catalog – without repeating a paged plant; vetoed and
+        excluded‑frame plants are never added. The KB snapshot is fixed when
+        this is called, so a paused generator resumes on the same KB version.
+        """
+        return self._pages(user_input, size, self.kb.snapshot(), first_page)
+
+    def iter_candidates(self, user_input: Dict[str, str], top_n: int = 5) -> Iterator[str]:
+        """Flat :meth:`iter_candidate_pages` stream; its first *top_n* equal get_candidates."""
+        return itertools.chain.from_iterable(self.iter_candidate_pages(user_input, top_n))
+
+    def get_candidates_batch(self, profiles_df: pd.DataFrame, top_n: int = 5) -> List[List[str]]:
+        """Vectorised :meth:`get_candidates` for every row of *profiles_df*.
+
+        Rule conditions and profiles are integer‑coded per attribute
+        (-1 = koşul yok, -2 = KB'de bilinmeyen değer); subset matches for all
+        distinct profiles are computed with NumPy broadcasting over the rules,
+        which are pre‑sorted in the scalar path's (confidence, lift) order.
+        Returns one ranked candidate list per row, in row order.
+        """
+        if profiles_df.empty:
+            return []
+
+        kb = self.kb.snapshot()
+        columns, order = kb.positive, kb.positive_order
+
+        # --- Attribute/value vocab (positive rules + meta-rules) ---------------
+        vocab: Dict[str, Dict[str, int]] = {}
+        meta_pairs = [item for m in kb.meta_rules for item in m.get("conditions", {}).items()]
+        for attr, val in list(kb.vocab.pairs) + meta_pairs:
+            codes = vocab.setdefault(attr, {})
+            codes.setdefault(val, len(codes))
+        cols = [c for c in profiles_df.columns if c in vocab]
+        col_pos = {c: j for j, c in enumerate(cols)}
+
+        # --- Rule condition matrix (n_rules × n_cols), KB pair codes → column codes
+        pair_col = np.array([col_pos.get(a, -1) for a, _ in kb.vocab.pairs], dtype=np.int64)
+        pair_val = np.array([vocab[a][v] for a, v in kb.vocab.pairs], dtype=np.int32)
+        owner = np.repeat(np.arange(len(columns)), columns.sizes())
+        cond_col = pair_col[columns.cond_codes]
+        known = cond_col >= 0
+
+        rule_codes = np.full((len(columns), len(cols)), -1, dtype=np.int32)
+        rule_codes[owner[known], cond_col[known]] = pair_val[columns.cond_codes[known]]
+        usable = np.ones(len(columns), dtype=bool)
+        usable[owner[~known]] = False  # profilde olmayan özellik → asla eşleşmez
+        plant_names = kb.vocab.plants
+        usable &= np.array([bool(p) for p in plant_names], dtype=bool)[columns.plant]
+
+        # (confidence, lift) sırasına diz
+        rule_codes, usable, rule_plant = rule_codes[order], usable[order], columns.plant[order]
+        n_rules = len(order)
+
+        # --- Profile matrix, deduplicated --------------------------------------
+        prof_codes = np.empty((len(profiles_df), len(cols)), dtype=np.int32)
+        for j, col in enumerate(cols):
+            prof_codes[:, j] = profiles_df[col].map(vocab[col]).fillna(-2).to_numpy(dtype=np.int32)
+        uniq, first_row, inverse = np.unique(prof_codes, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        representatives = profiles_df.iloc[first_row].to_dict(orient="records")
+
+        # --- Chunked subset matching -------------------------------------------
+        results: List[List[str]] = []
+        chunk = max(1, (1 << 24) // max(n_rules, 1))
+        for start in range(0, len(uniq), chunk):
+            block = uniq[start:start + chunk]
+            hit = np.broadcast_to(usable, (len(block), n_rules)).copy()
+            for j in range(len(cols)):
+                rc = rule_codes[:, j]
+                hit &= (rc == -1) | (rc[None, :] == block[:, j, None])
+
+            for k, profile in enumerate(representatives[start:start + chunk]):
+                if self.veto_mode == "profile" and self._is_forbidden(profile, kb):
+                    results.append([])
+                    continue
+                vetoed = self._vetoed_plants(profile, kb)
+                exact = [p for p in kb.exact_match(profile) if p not in vetoed]
+                if exact:
+                    results.append([exact[0]])
+                    continue
+                pids = rule_plant[np.flatnonzero(hit[k])]
+                _, first = np.unique(pids, return_index=True)
+                first = np.sort(first)
+                if vetoed:
+                    candidates = [plant_names[p] for p in pids[first] if plant_names[p] not in vetoed][:top_n]
+                else:
+                    candidates = [plant_names[p] for p in pids[first[:top_n]]]
+                results.append(self._finalize_candidates(profile, candidates, top_n, kb, vetoed))
+
+        logger.info("Batch candidates – %d profiles (%d distinct)", len(profiles_df), len(uniq))
+        return [list(results[i]) for i in inverse]
 
-        # Step 1 – hard negative veto (şimdilik devre dışı)
-        # if self._is_forbidden(user_input):
-        #     logger.info("❌ User input hit a negative veto – no suggestions.")
-        #     return []
-
-        # Step 2 – exact positive match first (highest precision)
-        for rule in self.kb.positive_rules:
-            if rule.matches(user_input, exact=True):  # Eğer exact match kontrolü varsa
-                logger.info("✅ Exact positive rule match → %s", rule.suggested_plant)
-                return [rule.suggested_plant]
-
-        # Step 3 – collect partial positive matches (recall)
-        matches = []
-        for rule in self.kb.positive_rules:
-            if rule.matches(user_input):
-                matches.append(rule)
-
-        # Güvenilirliğe göre sırala: confidence ve lift yüksek olanlar öne alınır
-        matches.sort(key=lambda r: (getattr(r, 'confidence', 0), getattr(r, 'lift', 0)), reverse=True)
-
-        # Aynı bitki tekrar etmesin
-        candidates = []
-        seen = set()
-        for rule in matches:
-            plant_name = getattr(rule, 'suggested_plant', None)
-            if plant_name and plant_name not in seen:
-                candidates.append(plant_name)
-                seen.add(plant_name)
-            if len(candidates) >= top_n:
-                break
-
+    # ----------------------------------------------------------
+    # Internal helpers
+    # ----------------------------------------------------------
+    def _candidates(self, user_input: Dict[str, str], top_n: int, kb: KBSnapshot) -> List[str]:
+        """Steps 1–5 of :meth:`get_candidates` on one KB snapshot."""
+        # Step 1 – negative veto via the negative-rule index (veto_mode)
+        if self.veto_mode == "profile" and self._is_forbidden(user_input, kb):
+            logger.info("❌ User input hit a negative veto – no suggestions.")
+            return []
+        vetoed = self._vetoed_plants(user_input, kb)
+
+        # Step 2 – exact positive match first (highest precision), O(1) lookup
+        exact = [p for p in kb.exact_match(user_input) if p not in vetoed]
+        if exact:
+            logger.info("✅ Exact positive rule match → %s", exact[0])
+            return [exact[0]]
+
+        # Step 3 – collect partial positive matches (recall) via inverted index,
+        # best (confidence, lift) first; heap seçimi → sadece ilk top_n bitki için sıralama
+        candidates = list(itertools.islice(self._ranked_rule_plants(user_input, kb, vetoed), top_n))
+
+        candidates = self._finalize_candidates(user_input, candidates, top_n, kb, vetoed)
+        logger.info("Final candidate list (%d): %s", len(candidates), candidates)
+        return candidates
+
+    def _pages(self, user_input: Dict[str, str], size: int, kb: KBSnapshot,
+               first_page: Optional[List[str]]) -> Iterator[List[str]]:
+        if first_page is None:
+            first_page = self._candidates(user_input, size, kb)
+        if not first_page:  # profil vetosu / boş katalog → devamı da boş
+            return
+        yield list(first_page)
+
+        suggested_frames, excluded = kb.meta.resolve(user_input) if len(kb.meta) else ([], 0)
+        seen = set(first_page) | self._vetoed_plants(user_input, kb)
+        seen.update(kb.vocab.plants[pid] for pid in _bit_ids(excluded))
+
+        def fresh(plants: Iterable[str]) -> Iterator[str]:
+            for plant in plants:
+                if plant and plant not in seen:
+                    seen.add(plant)
+                    yield plant
+
+        rest = itertools.chain(
+            fresh(kb.exact_match(user_input)),
+            fresh(self._ranked_rule_plants(user_input, kb, seen)),
+            fresh(kb.vocab.plants[pid] for frame in suggested_frames for pid in kb.meta.frame_plants[frame]),
+            fresh(self.catalog),
+        )
+        while True:
+            page = list(itertools.islice(rest, size))
+            if not page:
+                return
+            yield page
+
+    def _finalize_candidates(self, user_input: Dict[str, str], candidates: List[str], top_n: int,
+                             kb: Optional[KBSnapshot] = None, vetoed: frozenset = frozenset()) -> List[str]:
+        """Steps 4–5 shared by the scalar and batch paths."""
         # Step 4 – meta-rules (eğer varsa etkili olsun)
         if hasattr(self, '_apply_meta_rules'):
-            self._apply_meta_rules(user_input, candidates, top_n)
+            self._apply_meta_rules(user_input, candidates, top_n, kb)
+        if vetoed:
+            candidates[:] = [p for p in candidates if p not in vetoed]  # frame'lerden gelenler de dahil
 
         # Step 5 – yetersizse genel bitki listesinden tamamla
         if len(candidates) < top_n and hasattr(self, 'plants_df'):
-            for plant in self.plants_df["plant_name"].dropna().unique():
-                if plant not in candidates:
+            for plant in self.catalog:
+                if plant not in candidates and plant not in vetoed:
                     candidates.append(plant)
                 if len(candidates) >= top_n:
                     break
 
-        logger.info("Final candidate list (%d): %s", len(candidates), candidates[:top_n])
         return candidates[:top_n]
 
-    # ----------------------------------------------------------
-    # Internal helpers
-    # ----------------------------------------------------------
-    def _is_forbidden(self, user_input: Dict[str, str]) -> bool:
+    def _is_forbidden(self, user_input: Dict[str, str], kb: Optional[KBSnapshot] = None) -> bool:
         """Return True if ANY negative rule fully matches the profile."""
-        return any(r.matches(user_input) for r in self.kb.negative_rules)
-
-    def _collect_partial_matches(self, user_input: Dict[str, str]) -> List[str]:
-        """Add suggested_plant for every positive rule whose *subset* matches."""
-        cands: List[str] = []
-        for rule in self.kb.positive_rules:
-            if rule.conditions.items() <= user_input.items():  # subset match
-                if rule.suggested_plant not in cands:
-                    cands.append(rule.suggested_plant)
-        return cands
-
-    def _apply_meta_rules(self, user_input: Dict[str, str], cands: List[str], top_n: int) -> None:
+        kb = kb or self.kb.snapshot()
+        return kb.veto_index.vetoes(user_input)
+
+    def _vetoed_plants(self, user_input: Dict[str, str], kb: Optional[KBSnapshot] = None) -> frozenset:
+        """Plants of matching negative rules ("plant" veto mode only)."""
+        if self.veto_mode != "plant":
+            return frozenset()
+        kb = kb or self.kb.snapshot()
+        return kb.veto_index.plants(user_input)
+
+    def _ranked_rule_plants(self, user_input: Dict[str, str], kb: KBSnapshot,
+                            skip: Iterable[str] = ()) -> Iterator[str]:
+        """Plants of matching positive rules, best (confidence, lift) first, lazily.
+
+        Match ranks are heapified (O(m)) and popped on demand, so taking k
+        plants costs O(m + k·log m) instead of sorting all m matches.
+        """
+        ranks = kb.positive_rank[kb.positive_index.matching(user_input, ordered=False)].tolist()
+        heapq.heapify(ranks)
+        ranked_plants, names = kb.ranked_plants, kb.vocab.plants
+        seen = set(skip)
+        while ranks:
+            plant = names[ranked_plants[heapq.heappop(ranks)]]
+            if plant and plant not in seen:
+                seen.add(plant)
+                yield plant
+
+    def _apply_meta_rules(self, user_input: Dict[str, str], cands: List[str], top_n: int,
+                          kb: Optional[KBSnapshot] = None) -> None:
         """Expand / prune candidate list according to meta‑rules."""
-        suggested_frames: Set[str] = set()
-        excluded_frames: Set[str] = set()
-
-        for meta in self.kb.meta_rules:
-            cond = meta.get("conditions", {})
-            if cond.items() <= user_input.items():
-                suggested_frames.update(meta.get("suggested_types", []))
-                excluded_frames.update(meta.get("excluded_types", []))
+        kb = kb or self.kb.snapshot()
+        meta = kb.meta
+        if not len(meta):
+            return
+        suggested_frames, excluded = meta.resolve(user_input)
 
         # add suggested frame plants
+        plants = kb.vocab.plants
+        present = meta.plant_mask(cands)
         for frame in suggested_frames:
-            for plant in self.kb.frames.get(frame, []):
-                if plant not in cands:
-                    cands.append(plant)
+            for pid in meta.frame_plants[frame]:
+                if not present >> pid & 1:
+                    cands.append(plants[pid])
+                    present |= 1 << pid
                 if len(cands) >= top_n:
                     return
 
         # remove excluded frame plants
-        for frame in excluded_frames:
-            forbidden = set(self.kb.frames.get(frame, []))
-            cands[:] = [p for p in cands if p not in forbidden]
+        if excluded:
+            codes = kb.vocab.plant_codes
+            cands[:] = [p for p in cands if p not in codes or not excluded >> codes[p] & 1]
+
+
+# --------------------------------------------------------------
+# 📏 Memory benchmark – python rule_engine.py --bench-memory [N]
+# --------------------------------------------------------------
+def synthetic_rules(n_rules: int, n_plants: int = 300, seed: int = 0) -> List[dict]:
+    """Random positive rules over PROFILE_SPACE (2–5 conditions each)."""
+    rng = np.random.default_rng(seed)
+    attrs = list(PROFILE_SPACE)
+    rules = []
+    for n_cond, plant in zip(rng.integers(2, 6, n_rules), rng.integers(0, n_plants, n_rules)):
+        chosen = rng.choice(len(attrs), size=n_cond, replace=False)
+        rules.append({
+            "conditions": {attrs[j]: PROFILE_SPACE[attrs[j]][rng.integers(len(PROFILE_SPACE[attrs[j]]))] for j in chosen},
+            "suggested_plant": f"Plant {plant}",
+            "feedback": 1,
+            "confidence": float(rng.random()),
+            "lift": float(1 + rng.random()),
+            "support": float(rng.random() / 10),
+        })
+    return rules
+
+
+def benchmark_rule_memory(n_rules: int = 1_000_000, seed: int = 0) -> Dict[str, int]:
+    """Bytes retained by each rule representation, measured with tracemalloc.
+
+    The KB is round‑tripped through JSON first, so value strings are not
+    shared between rules – exactly what loading knowledge_base.json gives.
+    """
+    import gc
+    import tracemalloc
+    from types import SimpleNamespace
+
+    raw = json.dumps({"positive_rules": synthetic_rules(n_rules, seed=seed)})
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            kept = build()
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0], kept
+        finally:
+            tracemalloc.stop()
+
+    def dict_rules():
+        # eski @dataclass Rule düzeni: instance __dict__ + JSON'dan gelen conditions dict'i
+        return [SimpleNamespace(**r) for r in json.loads(raw)["positive_rules"]]
+
+    def columns():
+        vocab = KBVocab()
+        return RuleList(RuleColumns.from_dicts(json.loads(raw)["positive_rules"], vocab), vocab)
+
+    results: Dict[str, int] = {}
+    results["dict_rules"], kept = measure(dict_rules)
+    del kept
+    results["columns"], rule_list = measure(columns)
+    results["slotted_rules"], kept = measure(lambda: list(rule_list))
+    del kept
+    return results
 
 
 # --------------------------------------------------------------
@@ -203,12 +972,27 @@ if __name__ == "__main__":
     import pandas as pd
 
     parser = argparse.ArgumentParser(description="RuleEngine demo runner")
-    parser.add_argument("--kb", default="knowledge_base.json", help="Path to KB JSON")
-    parser.add_argument("--csv", required=True, help="plants.csv (must have plant_name column)")
+    parser.add_argument("--kb", default="knowledge_base.json", help="Path to KB JSON or compiled .kbc")
+    parser.add_argument("--csv", help="plants.csv (must have plant_name column)")
+    parser.add_argument("--veto", choices=VETO_MODES, default="off", help="Negative-rule veto mode")
+    parser.add_argument("--bench-memory", type=int, nargs="?", const=1_000_000, metavar="N",
+                        help="Measure rule memory on a synthetic N‑rule KB and exit")
     args = parser.parse_args()
 
+    if args.bench_memory:
+        mib = benchmark_rule_memory(args.bench_memory)
+        base = mib["dict_rules"]
+        print(f"{args.bench_memory:,} rules")
+        for name, label in (("dict_rules", "dict-backed Rule objects (previous)"),
+                            ("slotted_rules", "slotted, integer-coded Rule objects"),
+                            ("columns", "RuleColumns arrays (KB snapshot)")):
+            print(f"  {label:<38} {mib[name] / 2**20:9.1f} MiB  ({mib[name] / base:6.1%})")
+        raise SystemExit(0)
+    if not args.csv:
+        parser.error("--csv is required")
+
     df_plants = pd.read_csv(args.csv)
-    engine = RuleEngine(df_plants, kb_path=args.kb)
+    engine = RuleEngine(df_plants, kb_path=args.kb, veto_mode=args.veto)
 
     sample_profile = {
         "area_size": "Small",
@@ -0,0 +1,109 @@
+# score_table.py – Exhaustive feedback‑model score table
+# --------------------------------------------------------------
+# The feedback model only sees a handful of one‑hot encoded categorical
+# columns, so it can only ever produce (Π len(categories)) distinct scores.
+# learning_engine.py enumerates every combination right after training,
+# scores them in one batch and stores a dense table here. Serving a score
+# is then pure index arithmetic – no XGBoost / sklearn import needed.
+#
+# Each column gets one extra "unknown" slot mirroring the encoder's
+# handle_unknown="ignore" behaviour (all‑zero block).
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCORE_TABLE_PATH = "models/feedback_score_table.npz"
+MODEL_PATH = "models/feedback_model.pkl"
+
+_UNKNOWN = "__unknown__"
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 of a file – ties the table to the exact model pickle it came from."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def one_hot_layout(column_transformer) -> tuple[List[str], List[List[str]]]:
+    """Return (columns, categories) of the fitted "cat" OneHotEncoder."""
+    encoder = column_transformer.named_transformers_["cat"]
+    columns = list(column_transformer.transformers_[0][2])
+    categories = [[str(c) for c in cats] for cats in encoder.categories_]
+    return columns, categories
+
+
+class ScoreTable:
+    """Dense score lookup indexed by per‑column category codes."""
+
+    def __init__(self, columns: Sequence[str], categories: Sequence[Sequence[str]],
+                 scores: np.ndarray, model_sha256: str = "") -> None:
+        self.columns = list(columns)
+        self.categories = [list(c) for c in categories]
+        self.scores = scores
+        self.model_sha256 = model_sha256
+        self._codes: List[Dict[str, int]] = [
+            {val: i for i, val in enumerate(cats)} for cats in self.categories
+        ]
+
+    # ----------------------------------------------------------
+    # Build / persist
+    # ----------------------------------------------------------
+    @classmethod
+    def build(cls, model, column_transformer, model_sha256: str = "") -> "ScoreTable":
+        """Score every category combination (plus unknown slots) in one batch."""
+        import pandas as pd
+
+        columns, categories = one_hot_layout(column_transformer)
+        grid = list(itertools.product(*[cats + [_UNKNOWN] for cats in categories]))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # unknown slot → "unknown categories" uyarısı
+            encoded = column_transformer.transform(pd.DataFrame(grid, columns=columns))
+        proba = model.predict_proba(encoded)[:, 1]
+        shape = tuple(len(cats) + 1 for cats in categories)
+        logger.info("Score table built – %d combinations over %s", len(grid), columns)
+        return cls(columns, categories, np.asarray(proba).reshape(shape), model_sha256)
+
+    def save(self, path: str | Path = SCORE_TABLE_PATH) -> None:
+        meta = {"columns": self.columns, "categories": self.categories, "model_sha256": self.model_sha256}
+        np.savez(path, scores=self.scores, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+        logger.info("💾 Score table saved to '%s'", path)
+
+    @classmethod
+    def load(cls, path: str | Path = SCORE_TABLE_PATH) -> "ScoreTable":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["columns"], meta["categories"], data["scores"], meta["model_sha256"])
+
+    @classmethod
+    def load_if_current(cls, path: str | Path = SCORE_TABLE_PATH,
+                        model_path: str | Path = MODEL_PATH) -> Optional["ScoreTable"]:
+        """Load the table only if it was generated from the current model file."""
+        if not Path(path).exists() or not Path(model_path).exists():
+            return None
+        table = cls.load(path)
+        if table.model_sha256 != file_digest(model_path):
+            logger.warning("Score table is stale (model changed) – ignoring '%s'", path)
+            return None
+        return table
+
+    # ----------------------------------------------------------
+    # Lookup
+    # ----------------------------------------------------------
+    def score(self, records: Sequence[dict]) -> np.ndarray:
+        """Positive‑class probability for each record (same as predict_proba[:, 1])."""
+        idx = np.empty((len(self.columns), len(records)), dtype=np.intp)
+        for j, (col, codes) in enumerate(zip(self.columns, self._codes)):
+            unknown = len(codes)
+            idx[j] = [codes.get(str(rec.get(col)), unknown) for rec in records]
+        return self.scores[tuple(idx)]
@@ -0,0 +1,414 @@
+# storage.py – Shared database layer (pooled connections, pluggable backends)
+# --------------------------------------------------------------
+# Every module used to open its own pyodbc connection per call; connection
+# setup (driver load + login) then sat on the request path. This module owns
+# one process‑wide pool instead:
+#
+#   PLANT_DB_BACKEND = odbc    → SQL Server via pyodbc (SQLSERVER_CONN)   [default]
+#                      sqlite  → local file PLANT_DB_PATH (schema created on first use)
+#
+# • Bounded pool (PLANT_DB_POOL_SIZE): callers block until a connection is free
+# • Connections idle longer than HEALTH_CHECK_AFTER are pinged before reuse;
+#   broken ones are dropped and replaced transparently
+# • with storage.connection() as conn: … → commit on success, rollback on error
+# • bulk_insert(): chunked loads (fast_executemany / multi‑row VALUES on
+#   SQL Server, executemany in one transaction on SQLite) with rows/s report
+# Both backends use qmark ("?") parameters, so SQL is shared where the
+# dialects agree; backend‑specific bits (fingerprint, schema) live on the
+# backend classes.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import itertools
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyodbc
+except ImportError:  # SQLite backend pyodbc gerektirmez
+    pyodbc = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLSERVER_CONN = (
+    r"DRIVER={ODBC Driver 17 for SQL Server};"
+    r"SERVER=LAPTOP-7GK6MUOG\SQLEXPRESS;"
+    r"DATABASE=Smart_Plant_Recomandation_System;"
+    r"Trusted_Connection=yes;"
+)
+LOCAL_SQLSERVER_CONN = (  # Plant_Suggestion_System/ script'lerinin eski bağlantısı
+    r"DRIVER={ODBC Driver 17 for SQL Server};"
+    r"SERVER=localhost\SQLEXPRESS;"
+    r"DATABASE=Smart_Plant_Recomandation_System;"
+    r"Trusted_Connection=yes;"
+)
+DEFAULT_SQLITE_PATH = "plant_system.db"
+POOL_SIZE = int(os.environ.get("PLANT_DB_POOL_SIZE", "4"))
+HEALTH_CHECK_AFTER = 30.0  # saniye – bu kadar boşta kalan bağlantı kullanılmadan önce ping'lenir
+CHECKOUT_TIMEOUT = 30.0
+BULK_CHUNK = 10_000  # bulk_insert: executemany başına satır
+
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _insert_sql(table: str, columns: Sequence[str], n_rows: int = 1) -> str:
+    for name in (table, *columns):
+        if not _IDENT.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+    row = "(" + ", ".join("?" * len(columns)) + ")"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([row] * n_rows)
+
+
+# --------------------------------------------------------------
+# 🔌 Backends
+# --------------------------------------------------------------
+class OdbcBackend:
+    """SQL Server through pyodbc (production)."""
+
+    name = "odbc"
+    commit_per_chunk = True  # milyonlarca satırda transaction log'u şişirme
+
+    def __init__(self, conn_str: Optional[str] = None, fast_executemany: Optional[bool] = None) -> None:
+        self.conn_str = conn_str or os.getenv("SQLSERVER_CONN") or DEFAULT_SQLSERVER_CONN
+        if fast_executemany is None:
+            fast_executemany = os.getenv("PLANT_ODBC_FAST_EXECUTEMANY", "1") != "0"
+        self.fast_executemany = fast_executemany
+
+    def connect(self):
+        if not pyodbc:
+            raise RuntimeError("pyodbc is not installed – install it or set PLANT_DB_BACKEND=sqlite.")
+        server = self.conn_str.split("SERVER=")[-1].split(";")[0]
+        logger.info("ODBC connecting → %s", server)
+        return pyodbc.connect(self.conn_str, timeout=5)
+
+    def init_schema(self, conn) -> None:
+        pass  # şema SQL Server tarafında yönetiliyor
+
+    def ping(self, conn) -> None:
+        conn.cursor().execute("SELECT 1").fetchone()
+
+    def plants_fingerprint(self, conn) -> tuple:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM plants")
+        return tuple(cursor.fetchone())
+
+    def insert_rows(self, conn, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        cursor = conn.cursor()
+        if self.fast_executemany:
+            cursor.fast_executemany = True  # tüm parametre dizisi tek round‑trip
+            cursor.executemany(_insert_sql(table, columns), rows)
+        else:
+            # Sürücü fast_executemany desteklemiyorsa çok satırlı VALUES
+            # (SQL Server: ≤ 1000 satır ve ≤ 2100 parametre / ifade)
+            per_stmt = max(1, min(1000, 2099 // len(columns)))
+            for i in range(0, len(rows), per_stmt):
+                part = rows[i:i + per_stmt]
+                cursor.execute(_insert_sql(table, columns, len(part)), [v for r in part for v in r])
+        cursor.close()
+
+
+class SqliteBackend:
+    """Local SQLite file (development, tests, benchmarks)."""
+
+    name = "sqlite"
+    commit_per_chunk = False  # SQLite'ta tek transaction en hızlısı
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plants (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        plant_name  TEXT NOT NULL,
+        description TEXT,
+        image_url   TEXT
+    );
+    CREATE TABLE IF NOT EXISTS Feedback (
+        id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_size            TEXT,
+        sunlight_need        TEXT,
+        environment_type     TEXT,
+        climate_type         TEXT,
+        watering_frequency   TEXT,
+        fertilizer_frequency TEXT,
+        pesticide_frequency  TEXT,
+        has_pet              TEXT,
+        has_child            TEXT,
+        suggested_plant      TEXT,
+        user_feedback        INTEGER,
+        created_at           TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS ix_feedback_user_feedback ON Feedback (user_feedback);
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or os.getenv("PLANT_DB_PATH") or DEFAULT_SQLITE_PATH
+
+    def connect(self):
+        # Havuz bir bağlantıyı aynı anda tek thread'e verir → check_same_thread gereksiz
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def init_schema(self, conn) -> None:
+        conn.executescript(self.SCHEMA)
+
+    def ping(self, conn) -> None:
+        conn.execute("SELECT 1").fetchone()
+
+    def plants_fingerprint(self, conn) -> tuple:
+        # CHECKSUM_AGG yok; katalog küçük → satırların özeti yeterince ucuz
+        h = hashlib.sha256()
+        count = 0
+        for row in conn.execute("SELECT * FROM plants ORDER BY id"):
+            h.update(repr(row).encode("utf-8"))
+            count += 1
+        return count, h.hexdigest()
+
+    def insert_rows(self, conn, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        conn.executemany(_insert_sql(table, columns), rows)
+
+
+BACKENDS = {"odbc": OdbcBackend, "sqlite": SqliteBackend}
+
+
+# --------------------------------------------------------------
+# 🏊 Connection pool
+# --------------------------------------------------------------
+class ConnectionPool:
+    """Bounded, thread‑safe pool; connections are created lazily up to *size*."""
+
+    def __init__(self, backend, size: int = POOL_SIZE, health_check_after: float = HEALTH_CHECK_AFTER) -> None:
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.backend = backend
+        self.size = size
+        self.health_check_after = health_check_after
+        self._idle: "queue.LifoQueue[tuple[Any, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _new_connection(self):
+        conn = self.backend.connect()
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.backend.init_schema(conn)
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def acquire(self, timeout: float = CHECKOUT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No database connection free within {timeout:.0f}s (pool size {self.size})")
+        try:
+            while True:
+                try:
+                    conn, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._new_connection()
+                if time.monotonic() - idle_since < self.health_check_after:
+                    return conn
+                try:
+                    self.backend.ping(conn)
+                    return conn
+                except Exception as exc:
+                    logger.warning("Dropping broken %s connection (%s)", self.backend.name, exc)
+                    _close_quietly(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False) -> None:
+        try:
+            if broken:
+                _close_quietly(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection; commit on success, roll back (and recycle) on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True  # bağlantı kopmuş olabilir → havuza geri koyma
+            self.release(conn, broken=broken)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(conn)
+
+
+def _frame_rows(frame: pd.DataFrame) -> List[tuple]:
+    """DataFrame → DB‑API rows (NumPy scalars → Python, NaN → None)."""
+    values = frame.astype(object).where(frame.notna(), None).to_numpy().tolist()
+    return [tuple(r) for r in values]
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+# --------------------------------------------------------------
+# 🗄️ Storage facade
+# --------------------------------------------------------------
+class Storage:
+    """Query helpers on top of a :class:`ConnectionPool`."""
+
+    def __init__(self, backend, pool_size: int = POOL_SIZE) -> None:
+        self.backend = backend
+        self.pool = ConnectionPool(backend, pool_size)
+
+    @property
+    def dialect(self) -> str:
+        return self.backend.name
+
+    def connection(self):
+        return self.pool.connection()
+
+    def read_sql(self, query: str, params: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(params or ()))
+            columns = [c[0] for c in cursor.description]
+            rows = [tuple(r) for r in cursor.fetchall()]
+            cursor.close()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> int:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(params or ()))
+            rowcount = cursor.rowcount
+            cursor.close()
+        return rowcount
+
+    def executemany(self, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+        """Run *sql* for every row in one transaction (all or nothing)."""
+        rows = [tuple(r) for r in rows]
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(sql, rows)
+            cursor.close()
+        return len(rows)
+
+    def bulk_insert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence[Any]] | pd.DataFrame,
+        chunk_size: int = BULK_CHUNK,
+    ) -> Dict[str, float]:
+        """Load *rows* (tuples in *columns* order, or a DataFrame) into *table*.
+
+        Returns {"rows", "seconds", "rows_per_sec"}. On SQLite everything is
+        one transaction; on SQL Server each chunk is committed.
+        """
+        columns = list(columns)
+        if isinstance(rows, pd.DataFrame):
+            frame = rows[columns]
+            chunks = (_frame_rows(frame.iloc[i:i + chunk_size]) for i in range(0, len(frame), chunk_size))
+        else:
+            it = iter(rows)
+            chunks = iter(lambda: [tuple(r) for r in itertools.islice(it, chunk_size)], [])
+
+        total = 0
+        t0 = time.perf_counter()
+        with self.connection() as conn:
+            for chunk in chunks:
+                self.backend.insert_rows(conn, table, columns, chunk)
+                total += len(chunk)
+                if self.backend.commit_per_chunk:
+                    conn.commit()
+        seconds = time.perf_counter() - t0
+        report = {"rows": total, "seconds": seconds, "rows_per_sec": total / seconds if seconds else 0.0}
+        logger.info(
+            "📥 %d rows → %s in %.2fs (%.0f rows/s, %s)",
+            total, table, seconds, report["rows_per_sec"], self.dialect,
+        )
+        return report
+
+    def scalar(self, sql: str, params: Optional[Sequence[Any]] = None) -> Any:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(params or ()))
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row else None
+
+    def plants_fingerprint(self) -> tuple:
+        with self.connection() as conn:
+            return self.backend.plants_fingerprint(conn)
+
+    def healthy(self) -> bool:
+        try:
+            with self.connection() as conn:
+                self.backend.ping(conn)
+            return True
+        except Exception as exc:
+            logger.error("❌ %s storage health check failed: %s", self.dialect, exc)
+            return False
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+
+def make_storage(backend: Optional[str] = None, **options) -> Storage:
+    """New Storage for *backend* ('odbc' | 'sqlite'; default: $PLANT_DB_BACKEND)."""
+    name = (backend or os.getenv("PLANT_DB_BACKEND") or "odbc").lower()
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PLANT_DB_BACKEND '{name}' (expected one of {sorted(BACKENDS)})") from None
+    pool_size = options.pop("pool_size", POOL_SIZE)
+    return Storage(backend_cls(**options), pool_size)
+
+
+def use_local_sqlserver() -> None:
+    """Default SQL Server → LOCAL_SQLSERVER_CONN (call before get_storage); SQLSERVER_CONN still wins."""
+    os.environ.setdefault("SQLSERVER_CONN", LOCAL_SQLSERVER_CONN)
+
+
+def get_storage() -> Storage:
+    """Process‑wide Storage configured from the environment."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = make_storage()
+                logger.info("🗄️ Storage backend: %s (pool size %d)", _storage.dialect, _storage.pool.size)
+    return _storage
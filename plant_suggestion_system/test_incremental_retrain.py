@@ -0,0 +1,87 @@
+# test_incremental_retrain.py – Two DB retrains through the real miner + KB path
+# --------------------------------------------------------------
+# learning_engine_v2.mine_next_batch → kb_updater.update_knowledge_base, twice,
+# on a SQLite Feedback table. The second batch must be pooled onto the first
+# (same stats as mining both batches at once), and replaying it or retraining
+# without new rows must leave the KB unchanged.
+#
+#   python -m pytest test_incremental_retrain.py
+# --------------------------------------------------------------
+
+import json
+import math
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("mlxtend")
+
+import storage  # noqa: E402
+from kb_journal import read_kb_source, rule_key  # noqa: E402
+from kb_updater import update_knowledge_base  # noqa: E402
+from learning_engine_v2 import mine_association_rules, mine_next_batch  # noqa: E402
+
+COLUMNS = [
+    "area_size", "sunlight_need", "environment_type", "climate_type", "watering_frequency",
+    "fertilizer_frequency", "pesticide_frequency", "has_pet", "has_child",
+    "suggested_plant", "user_feedback",
+]
+MINING = {"min_support": 0.05, "min_confidence": 0.3}
+
+
+def _feedback(n_fern: int, n_basil: int) -> pd.DataFrame:
+    fern = ["Small", "Indirect light", "Indoor", "All seasons", "Weekly", "Monthly", "Never", "No", "No", "Fern", 1]
+    basil = ["Medium", "6+ hours", "Outdoor", "Summer", "Daily", "Monthly", "Never", "No", "No", "Basil", 1]
+    return pd.DataFrame([fern] * n_fern + [basil] * n_basil, columns=COLUMNS)
+
+
+def _rules(kb_path) -> dict:
+    kb, _ = read_kb_source(kb_path)
+    return {rule_key(r): r for r in kb["positive_rules"]}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLANT_DB_BACKEND", "sqlite")
+    monkeypatch.setenv("PLANT_DB_PATH", str(tmp_path / "feedback.db"))
+    monkeypatch.setattr(storage, "_storage", None)
+    return storage.get_storage()
+
+
+def _retrain(kb_path, parsed_path):
+    batch_id = mine_next_batch(str(kb_path), output_path=str(parsed_path), **MINING)
+    update_knowledge_base(parsed_path, kb_path, compact_async=False)
+    return batch_id
+
+
+def test_two_retrains_pool_disjoint_batches(db, tmp_path):
+    kb_path, parsed_path = tmp_path / "knowledge_base.json", tmp_path / "parsed_rules.json"
+    kb_path.write_text(json.dumps({"positive_rules": [], "negative_rules": []}), encoding="utf-8")
+
+    db.bulk_insert("Feedback", COLUMNS, _feedback(60, 40))
+    assert _retrain(kb_path, parsed_path) == "1-100"
+    db.bulk_insert("Feedback", COLUMNS, _feedback(30, 70))
+    assert _retrain(kb_path, parsed_path) == "101-200"
+    pooled = _rules(kb_path)
+
+    # Tek seferde madenlenen 200 kayıt ile aynı istatistikler
+    full_kb, full_parsed = tmp_path / "full_kb.json", tmp_path / "full_rules.json"
+    full_kb.write_text(json.dumps({"positive_rules": [], "negative_rules": []}), encoding="utf-8")
+    mine_association_rules(
+        db.read_sql("SELECT * FROM Feedback WHERE user_feedback = 1"), output_path=str(full_parsed), **MINING
+    )
+    update_knowledge_base(full_parsed, full_kb, compact_async=False)
+    full = _rules(full_kb)
+
+    both = [k for k, r in pooled.items() if r.get("batch_ids") == ["1-100", "101-200"]]
+    assert both
+    for key in both:
+        assert pooled[key]["n_transactions"] == 200
+        for stat in ("support", "confidence", "lift"):
+            assert math.isclose(pooled[key][stat], full[key][stat], rel_tol=1e-9)
+
+    # Aynı partiyi tekrar uygulamak / yeni kayıt yokken retrain → KB değişmez
+    update_knowledge_base(parsed_path, kb_path, compact_async=False)
+    assert _rules(kb_path) == pooled
+    assert _retrain(kb_path, parsed_path) is None
+    assert _rules(kb_path) == pooled
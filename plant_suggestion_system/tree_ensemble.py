@@ -0,0 +1,105 @@
+# tree_ensemble.py – Pure‑NumPy evaluator for the exported XGBoost trees
+# --------------------------------------------------------------
+# learning_engine.export_tree_ensemble() flattens every booster tree into
+# parallel node arrays (feature, threshold, yes/no/missing child, leaf value).
+# TreeEnsemble walks all rows × all trees at once with vectorised gathers,
+# so the app can score without importing xgboost or unpickling the model.
+#
+# Leaf nodes point to themselves, which lets the traversal run a fixed
+# max_depth steps without per‑tree bookkeeping.
+# --------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from score_table import MODEL_PATH, file_digest
+
+logger = logging.getLogger(__name__)
+
+TREES_PATH = "models/feedback_trees.npz"
+
+_ARRAYS = ("feature", "threshold", "yes", "no", "missing", "value", "roots")
+
+
+class TreeEnsemble:
+    """Flat‑array binary:logistic tree ensemble with an XGBClassifier‑like API."""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, yes: np.ndarray,
+                 no: np.ndarray, missing: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 base_margin: float, max_depth: int, n_features: int,
+                 model_sha256: str = "") -> None:
+        self.feature = feature
+        self.threshold = threshold
+        self.yes = yes
+        self.no = no
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.model_sha256 = model_sha256
+
+    # ----------------------------------------------------------
+    # Persist
+    # ----------------------------------------------------------
+    def save(self, path: str | Path = TREES_PATH) -> None:
+        meta = {
+            "base_margin": self.base_margin,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "model_sha256": self.model_sha256,
+        }
+        np.savez(path, meta=np.array(json.dumps(meta)), **{k: getattr(self, k) for k in _ARRAYS})
+        logger.info("💾 Tree ensemble saved to '%s' (%d trees, %d nodes)", path, len(self.roots), len(self.value))
+
+    @classmethod
+    def load(cls, path: str | Path = TREES_PATH) -> "TreeEnsemble":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(**{k: data[k] for k in _ARRAYS}, **meta)
+
+    @classmethod
+    def load_if_current(cls, path: str | Path = TREES_PATH,
+                        model_path: str | Path = MODEL_PATH) -> Optional["TreeEnsemble"]:
+        """Load the export only if it came from the current model pickle."""
+        if not Path(path).exists() or not Path(model_path).exists():
+            return None
+        ensemble = cls.load(path)
+        if ensemble.model_sha256 != file_digest(model_path):
+            logger.warning("Tree export is stale (model changed) – ignoring '%s'", path)
+            return None
+        return ensemble
+
+    # ----------------------------------------------------------
+    # Inference
+    # ----------------------------------------------------------
+    def _dense(self, X) -> np.ndarray:
+        """Sparse input → dense float matrix with NaN for absent entries (XGBoost "missing")."""
+        if hasattr(X, "tocsr"):
+            X = X.tocsr()
+            dense = np.full(X.shape, np.nan, dtype=np.float32)
+            rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            dense[rows, X.indices] = X.data
+            return dense
+        return np.asarray(X, dtype=np.float32)
+
+    def predict_margin(self, X) -> np.ndarray:
+        X = self._dense(X)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            nxt = np.where(x < self.threshold[node], self.yes[node], self.no[node])
+            node = np.where(np.isnan(x), self.missing[node], nxt)
+        return self.base_margin + self.value[node].sum(axis=1, dtype=np.float32)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X).astype(np.float64)))
+        return np.column_stack([1.0 - p, p]).astype(np.float32)